@@ -1,3 +1,13 @@
+import os
+
+# eventlet and gevent must patch the standard library before anything else imports it
+if __name__ == '__main__' and os.getenv('SOCKETIO_ASYNC_MODE') == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+elif __name__ == '__main__' and os.getenv('SOCKETIO_ASYNC_MODE') == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_login import LoginManager
@@ -6,20 +16,45 @@ from sqlalchemy import text
 from models import db, Login, Venue
 from routes import api
 from socket_manager import socketio
-import os
+from message_queue import client_manager
+from venue_updates import venue_updates
+from notifications import notification_queue
+from booking_index import booking_index
+from identity import identity_cache
+from passwords import password_hasher
+from presence import presence
+import query_stats
+import response_cache
+from pagination import NEXT_CURSOR_HEADER, PAGE_LIMIT_HEADER
+from search_index import ensure_search_index, check_search_index
+import outbox
 from flask_bcrypt import Bcrypt
 from datetime import datetime
 
-def create_app():
+def create_app(test_config=None):
     app = Flask(__name__)
     app.config.from_object(Config)
+    if test_config:
+        app.config.update(test_config)
     
     # Initialize extensions
     db.init_app(app)
-    CORS(app, origins=Config.CORS_ORIGINS, supports_credentials=True)
+    CORS(app, origins=Config.CORS_ORIGINS, supports_credentials=True,
+         expose_headers=[NEXT_CURSOR_HEADER, PAGE_LIMIT_HEADER, 'Link', 'ETag'])
+    booking_index.init_app(app)
+    identity_cache.init_app(app)
+    password_hasher.init_app(app)
+    presence.init_app(app)
+    query_stats.init_app(app)
+    response_cache.init_app(app)
+    check_search_index(app)
+    outbox.init_app(app)
     
-    # Initialize SocketIO
-    socketio.init_app(app, cors_allowed_origins="*", async_mode='threading')
+    # Initialize SocketIO, sharing emits with the other server processes through the message queue
+    socketio.init_app(app, cors_allowed_origins="*", async_mode=app.config['SOCKETIO_ASYNC_MODE'],
+                      client_manager=client_manager(app.config.get('SOCKETIO_MESSAGE_QUEUE')))
+    venue_updates.init_app(app, socketio)
+    notification_queue.init_app(app, socketio)
     
     # Initialize Login Manager
     login_manager = LoginManager()
@@ -28,7 +63,7 @@ def create_app():
     
     @login_manager.user_loader
     def load_user(user_id):
-        return Login.query.get(int(user_id))
+        return identity_cache.load(int(user_id))
     
     # Register blueprints
     app.register_blueprint(api, url_prefix='/api')
@@ -157,12 +192,13 @@ def create_app():
         if created:
             db.session.commit()
 
-    # Seed default data on app creation
-    with app.app_context():
-        try:
-            ensure_default_data()
-        except Exception as seed_exc:
-            print(f"Seeding skipped: {seed_exc}")
+    # Seed default data on app creation (tests, benchmarks and migrations opt out)
+    if app.config.get('SEED_DEFAULT_DATA', True):
+        with app.app_context():
+            try:
+                ensure_default_data()
+            except Exception as seed_exc:
+                print(f"Seeding skipped: {seed_exc}")
     
     # Error handlers
     @app.errorhandler(404)
@@ -196,13 +232,14 @@ if __name__ == '__main__':
 
         # Create all tables across all binds
         db.create_all()
+        ensure_search_index()
         print("Database tables (all binds) created successfully!")
     
     # Run the app with SocketIO
     socketio.run(
         app,
         host='0.0.0.0',
-        port=5001,
+        port=int(os.getenv('PORT', '5001')),
         debug=True,
         use_reloader=True
     )
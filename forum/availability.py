@@ -0,0 +1,198 @@
+"""
+Free slot computation for venues.
+
+A venue's week is described by free text (`operating_days`, e.g.
+"Monday,Tuesday" or "Mon-Sun", and `operating_hours`, e.g.
+"6:00 AM - 10:00 PM"). These helpers parse it once and build one
+minute-resolution bitmap per day, held in a Python int: opening hours and
+availability overrides set bits, bookings clear them. Slots are then read
+off the bitmap with a mask comparison each.
+
+For searches across many venues, free_at_filter expresses "no active
+booking or blocking override overlaps this window" as a single correlated
+NOT EXISTS, so the database answers it for every venue in one statement.
+Whether the venue is open at all during the window depends on the free
+text and on available overrides, so open_for_window checks it in Python
+with open_bits, the same rule the grid uses.
+"""
+
+import re
+from datetime import datetime, timedelta
+
+from collections import defaultdict
+
+from sqlalchemy import exists, or_, true
+
+from models import db, Venue, VenueAvailability, Booking
+from booking_index import interval_minutes, ACTIVE_STATUSES, MINUTES_PER_DAY
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+ALL_DAYS = frozenset(range(7))
+
+_TIME_RE = re.compile(r'(\d{1,2})(?::(\d{2}))?\s*([ap])?\.?\s*m?\.?', re.IGNORECASE)
+
+
+def parse_operating_days(text):
+    """Return the set of weekday numbers (Monday is 0) a venue is open"""
+    if not text or text.strip().lower() in ('daily', 'everyday', 'all days', 'all'):
+        return ALL_DAYS
+
+    days = set()
+    for part in text.split(','):
+        part = part.strip().lower()
+        if not part:
+            continue
+        if '-' in part:
+            first, last = (p.strip()[:3] for p in part.split('-', 1))
+            if first in WEEKDAYS and last in WEEKDAYS:
+                start, end = WEEKDAYS.index(first), WEEKDAYS.index(last)
+                span = (end - start) % 7
+                days.update((start + i) % 7 for i in range(span + 1))
+        elif part[:3] in WEEKDAYS:
+            days.add(WEEKDAYS.index(part[:3]))
+    return frozenset(days) or ALL_DAYS
+
+
+def _parse_clock(match):
+    hour = int(match.group(1))
+    minute = int(match.group(2) or 0)
+    meridiem = (match.group(3) or '').lower()
+    if meridiem == 'a' and hour == 12:
+        hour = 0
+    elif meridiem == 'p' and hour != 12:
+        hour += 12
+    return hour * 60 + minute
+
+
+def parse_operating_hours(text):
+    """Return (open, close) in minutes since midnight; close may be 1440"""
+    matches = list(_TIME_RE.finditer(text or ''))
+    if len(matches) < 2:
+        return 0, MINUTES_PER_DAY
+
+    opens = _parse_clock(matches[0])
+    closes = _parse_clock(matches[1])
+    if closes <= opens:
+        # "5:00 AM - 12:00 AM" closes at midnight
+        closes = MINUTES_PER_DAY
+    return min(opens, MINUTES_PER_DAY), min(closes, MINUTES_PER_DAY)
+
+
+def span_bits(start, end):
+    """Bitmap with minutes [start, end) set, clipped to one day"""
+    start = max(0, start)
+    end = min(end, MINUTES_PER_DAY)
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+
+def slot_mask(minutes_free, slot_minutes):
+    """Collapse a minute bitmap into a '1'/'0' string, one char per slot"""
+    full = (1 << slot_minutes) - 1
+    return ''.join(
+        '1' if (minutes_free >> offset) & full == full else '0'
+        for offset in range(0, MINUTES_PER_DAY, slot_minutes)
+    )
+
+
+def open_bits(venue, day, opened=None):
+    """
+    Minutes a venue is open on a day, as a bitmap. `opened` holds the bits
+    of the day's available overrides, if any; they replace the regular
+    opening hours.
+    """
+    if opened is not None:
+        return opened
+    if day.weekday() in parse_operating_days(venue.operating_days):
+        return span_bits(*parse_operating_hours(venue.operating_hours))
+    return 0
+
+
+def _override_bits(overrides):
+    opened, blocked = {}, {}
+    for row in overrides:
+        bits = span_bits(*interval_minutes(row.start_time, row.end_time))
+        target = opened if row.is_available else blocked
+        target[row.date] = target.get(row.date, 0) | bits
+    return opened, blocked
+
+
+def build_availability_grid(venue, overrides, bookings, start_date, end_date, slot_minutes):
+    """
+    Compute per-day free slot masks for a venue.
+
+    `overrides` are VenueAvailability rows and `bookings` are
+    (st_date, start_time, end_time) rows of active bookings, both already
+    limited to the date range. On days with available overrides those
+    windows replace the regular opening hours; unavailable overrides are
+    always blocked.
+    """
+    opened, blocked = _override_bits(overrides)
+    for row in bookings:
+        bits = span_bits(*interval_minutes(row.start_time, row.end_time))
+        blocked[row.st_date] = blocked.get(row.st_date, 0) | bits
+
+    days = []
+    current = start_date
+    while current <= end_date:
+        free = open_bits(venue, current, opened.get(current)) & ~blocked.get(current, 0)
+        days.append({"date": current.isoformat(), "mask": slot_mask(free, slot_minutes)})
+        current += timedelta(days=1)
+    return days
+
+
+def booking_window(day, start_time, duration_hours):
+    """Return the end time of a slot, as create_booking computes it"""
+    return (datetime.combine(day, start_time) + timedelta(hours=duration_hours)).time()
+
+
+def free_at_filter(day, start_time, end_time):
+    """SQL condition matching venues with nothing booked or blocked in the window"""
+    wraps = end_time <= start_time
+    # An interval [s, e) overlaps the window if it starts before the window
+    # ends and ends after it starts; intervals running past midnight
+    # (end <= start) end after any start on their day
+    booking_overlap = exists().where(
+        Booking.venue_id == Venue.v_no,
+        Booking.st_date == day,
+        Booking.status.in_(ACTIVE_STATUSES),
+        true() if wraps else Booking.start_time < end_time,
+        or_(Booking.end_time > start_time, Booking.end_time <= Booking.start_time)
+    )
+    blocked_overlap = exists().where(
+        VenueAvailability.venue_id == Venue.v_no,
+        VenueAvailability.date == day,
+        VenueAvailability.is_available.is_(False),
+        true() if wraps else VenueAvailability.start_time < end_time,
+        or_(VenueAvailability.end_time > start_time,
+            VenueAvailability.end_time <= VenueAvailability.start_time)
+    )
+    return ~booking_overlap & ~blocked_overlap
+
+
+def is_open_for(venue, day, start_time, end_time, overrides=()):
+    """Check a window against the venue's opening hours that day, given its VenueAvailability rows"""
+    start, end = interval_minutes(start_time, end_time)
+    if end > MINUTES_PER_DAY:
+        return False
+    window = span_bits(start, end)
+    opened, _ = _override_bits(overrides)
+    return open_bits(venue, day, opened.get(day)) & window == window
+
+
+def open_for_window(rows, day, start_time, end_time):
+    """
+    Keep the venue rows open for the whole window, loading that day's
+    available overrides of all of them with one query.
+    """
+    if not rows:
+        return rows
+    overrides = defaultdict(list)
+    for row in db.session.query(VenueAvailability).filter(
+        VenueAvailability.venue_id.in_({row.v_no for row in rows}),
+        VenueAvailability.date == day,
+        VenueAvailability.is_available.is_(True)
+    ):
+        overrides[row.venue_id].append(row)
+    return [row for row in rows if is_open_for(row, day, start_time, end_time, overrides[row.v_no])]
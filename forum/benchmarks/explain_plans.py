@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Query plan check for a recorded workload.
+
+Replays every distinct SELECT, UPDATE and DELETE of a workload file through
+EXPLAIN (EXPLAIN QUERY PLAN on SQLite) and flags full table scans: a plain
+"SCAN <table>" on SQLite, access type ALL on MySQL.
+
+Record a workload from a running server by setting QUERY_LOG_PATH, then
+replay it against the same database:
+
+    QUERY_LOG_PATH=workload.jsonl python app.py
+    python benchmarks/explain_plans.py workload.jsonl
+
+Without a file, a workload is recorded first by calling the main read
+endpoints against an in-memory database seeded like query_counts.py.
+Exits non-zero if any statement scans a whole table.
+
+Usage: python benchmarks/explain_plans.py [workload.jsonl]
+"""
+
+import json
+import os
+import re
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import DBAPIError
+from app import create_app
+from models import db
+import query_stats
+from query_counts import TEST_CONFIG, seed
+
+# Endpoints called to record the built-in workload
+WORKLOAD = [
+    '/api/venues',
+    '/api/venues?sport=tennis',
+    '/api/venues?min_price=5&max_price=50',
+    '/api/venues?date=2030-01-07&start_time=09:00&duration=1',
+    '/api/venue/1',
+    '/api/venue/1/reviews',
+    '/api/venue/1/ratings?days=90&granularity=week',
+    '/api/search/venues?q=Court',
+    '/api/bookings',
+    '/api/dashboard/stats',
+    '/api/matches?sport=Tennis',
+    '/api/notifications',
+    '/api/notifications?unread=true',
+    '/api/notifications/unread-count',
+]
+
+_EXPLAINED = re.compile(r'^\s*(SELECT|UPDATE|DELETE|WITH)\b', re.IGNORECASE)
+_SQLITE_FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)$')
+
+
+def load_workload(path):
+    """Distinct explainable statements with the endpoints that ran them"""
+    statements = {}
+    with open(path, encoding='utf-8') as workload:
+        for line in workload:
+            entry = json.loads(line)
+            if not _EXPLAINED.match(entry['statement']):
+                continue
+            key = (entry['dialect'], entry['statement'])
+            item = statements.setdefault(key, {**entry, 'endpoints': set()})
+            if entry.get('endpoint'):
+                item['endpoints'].add(entry['endpoint'])
+    return list(statements.values())
+
+
+def _params(parameters):
+    if isinstance(parameters, dict):
+        return parameters
+    return tuple(parameters or ())
+
+
+def explain(entry):
+    """(plan lines, scanned tables) on the first bind that knows the tables"""
+    prefix = 'EXPLAIN QUERY PLAN ' if entry['dialect'] == 'sqlite' else 'EXPLAIN '
+    error = None
+    for engine in db.engines.values():
+        if engine.dialect.name != entry['dialect']:
+            continue
+        try:
+            with engine.connect() as conn:
+                rows = conn.exec_driver_sql(prefix + entry['statement'], _params(entry['parameters'])).mappings().all()
+        except DBAPIError as e:
+            error = e
+            continue
+        if entry['dialect'] == 'sqlite':
+            plan = [row['detail'] for row in rows]
+            scans = [m.group(1) for m in map(_SQLITE_FULL_SCAN.match, plan) if m]
+        else:
+            plan = [f"{row['table']}: {row['type']} key={row['key']} rows={row['rows']}" for row in rows]
+            scans = [row['table'] for row in rows if row['type'] == 'ALL']
+        return plan, scans
+    raise RuntimeError(f"No {entry['dialect']} database could explain the statement: {error}")
+
+
+def record_builtin_workload(path):
+    """Seed an in-memory database and record WORKLOAD into path"""
+    app = create_app({**TEST_CONFIG, 'RESPONSE_CACHE_BACKEND': 'none'})
+    with app.app_context():
+        db.create_all()
+        seed(200)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+        session['_fresh'] = True
+
+    query_stats.start_recording(path)
+    try:
+        for endpoint in WORKLOAD:
+            client.get(endpoint)
+    finally:
+        query_stats.stop_recording()
+    return app
+
+
+def run(path=None):
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), 'workload.jsonl')
+        app = record_builtin_workload(path)
+        print(f"🚀 Recorded built-in workload of {len(WORKLOAD)} endpoints\n")
+    else:
+        app = create_app({'SEED_DEFAULT_DATA': False})
+        print(f"🚀 Replaying {path}\n")
+
+    full_scans = 0
+    with app.app_context():
+        statements = load_workload(path)
+        for entry in statements:
+            plan, scans = explain(entry)
+            full_scans += bool(scans)
+            endpoints = ', '.join(sorted(entry['endpoints'])) or '(no request)'
+            marker = f"❌ full scan of {', '.join(scans)}" if scans else '✅'
+            print(f"{marker}  [{endpoints}]")
+            print(f"   {' '.join(entry['statement'].split())[:160]}")
+            for line in plan:
+                print(f"     {line}")
+        print(f"\n{len(statements)} statements, {full_scans} with full table scans")
+    return full_scans == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run(sys.argv[1] if len(sys.argv) > 1 else None) else 1)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Notification pipeline benchmark.
+
+Seeds an in-memory database with N users and times:
+
+- one-by-one: the old path, one INSERT, commit and emit per notification
+  (run for 1000 notifications)
+- queued:     the same 1000 notifications through send_notification and
+  one commit, which stores them with multi-row INSERTs
+- announce:   broadcast_system_message to every user, and to an explicit
+  list of all N user ids
+
+For each, the time the producer spends in the calls is shown next to the
+time its commit takes to store and emit everything. A socket client logged
+in as user 1 checks that the pushes arrive, and a rolled back transaction
+checks that nothing is stored or pushed for it.
+
+Usage: python benchmarks/notifications.py [N]
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert
+
+from app import create_app
+from models import db, Login, Notification
+from notifications import notification_queue
+from query_counts import TEST_CONFIG
+from socket_manager import socketio, send_notification, broadcast_system_message
+
+SINGLE = 1000
+
+
+def seed_users(n):
+    db.session.execute(insert(Login), [{
+        'fullname': f'User {i}', 'email': f'user{i}@bench.local', 'contact_number': '0',
+        'designation': 'player', 'password_hash': 'x'
+    } for i in range(n)])
+    db.session.commit()
+
+
+def one_by_one(count):
+    """The previous send_notification: insert, commit and emit each row"""
+    for i in range(count):
+        notification = Notification(user_id=i % 50 + 1, title='Booking', message=f'Old path {i}', type='booking',
+                                    data=json.dumps({'booking_id': i}))
+        db.session.add(notification)
+        db.session.commit()
+        socketio.emit('new_notification', notification.to_dict(), room=f"user_{notification.user_id}")
+
+
+def timed(func):
+    started = time.perf_counter()
+    func()
+    return (time.perf_counter() - started) * 1000
+
+
+def report(label, rows, produce_ms, commit_ms):
+    total_ms = produce_ms + commit_ms
+    print(f"{label:22} {rows:7} rows  producer {produce_ms:9.1f} ms  commit {commit_ms:9.1f} ms  "
+          f"{rows / (total_ms / 1000):9.0f} rows/s")
+
+
+def count_notifications():
+    return db.session.query(func.count(Notification.id)).scalar()
+
+
+def run_benchmark(n):
+    print(f"🚀 Notification pipeline benchmark with {n} users\n")
+    app = create_app(TEST_CONFIG)
+    with app.app_context():
+        db.create_all()
+        seed_users(n)
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = '1'
+            session['_fresh'] = True
+        watcher = socketio.test_client(app, flask_test_client=client)
+        watcher.get_received()
+
+        ok = True
+        before = count_notifications()
+        report('one-by-one', SINGLE, timed(lambda: one_by_one(SINGLE)), 0.0)
+
+        produce = timed(lambda: [send_notification(i % 50 + 1, 'Booking', f'Queued {i}', 'booking', {'booking_id': i})
+                                 for i in range(SINGLE)])
+        report('queued', SINGLE, produce, timed(db.session.commit))
+
+        report('announce (all users)', n, timed(lambda: broadcast_system_message('Maintenance tonight')),
+               timed(db.session.commit))
+        user_ids = list(range(1, n + 1))
+        report('announce (id list)', n, timed(lambda: broadcast_system_message('Courts reopen', user_ids)),
+               timed(db.session.commit))
+
+        send_notification(1, 'Booking', 'Rolled back', 'booking')
+        broadcast_system_message('Rolled back')
+        db.session.rollback()
+
+        stored = count_notifications() - before
+        expected = 2 * SINGLE + 2 * n
+        received = [event['name'] for event in watcher.get_received()]
+        print(f"\n{stored} notifications stored (expected {expected}), user 1 received "
+              f"{received.count('new_notification')} new_notification and {received.count('system_message')} "
+              f"system_message events")
+        print(f"Pipeline: {notification_queue.metrics.snapshot()}")
+        ok &= stored == expected and received.count('system_message') == 2
+    return ok
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    sys.exit(0 if run_benchmark(users) else 1)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Query count benchmark for the list endpoints.
+
+Seeds an in-memory database with N venues, bookings and reviews, calls each
+list endpoint and reports the X-Query-Count header. The counts must not
+grow with N; the script exits non-zero if any endpoint exceeds its budget.
+
+Usage: python benchmarks/query_counts.py [N]
+"""
+
+import os
+import sys
+import time
+from datetime import date, time as dtime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from app import create_app
+from models import db, Login, Venue, Booking, Review
+from query_stats import QUERY_COUNT_HEADER
+from search_index import ensure_search_index
+
+TEST_CONFIG = {
+    'TESTING': True,
+    'SEED_DEFAULT_DATA': False,
+    'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+    'SQLALCHEMY_BINDS': {'matches': 'sqlite://'},
+    'SQLALCHEMY_ENGINE_OPTIONS': {},
+    # Measure the database path, not cached responses
+    'RESPONSE_CACHE_BACKEND': 'none',
+    # Every thread shares the one in-memory connection, so nothing drains in the background
+    'OUTBOX_WORKER': False,
+}
+
+# Maximum statements each endpoint may issue, independent of N
+QUERY_BUDGETS = {
+    '/api/venues': 3,
+    '/api/search/venues?q=Court': 3,
+    '/api/venue/1/reviews': 3,
+    '/api/bookings': 5,
+}
+
+
+def seed(n):
+    """Bulk insert n venues, bookings and reviews without firing ORM events"""
+    db.session.execute(insert(Login), [{
+        'fullname': f'Owner {i}', 'email': f'owner{i}@bench.local', 'contact_number': '0',
+        'designation': 'facilities', 'password_hash': 'x'
+    } for i in range(n)])
+    db.session.execute(insert(Venue), [{
+        'user_id': i + 1, 'address': f'{i} Bench Road', 'court_name': f'Bench Court {i}',
+        'per_hr_charge': 10, 'operating_days': 'Mon-Sun', 'operating_hours': '6 AM - 10 PM',
+        'sports': 'Tennis'
+    } for i in range(n)])
+    db.session.execute(insert(Booking), [{
+        'venue_id': 1, 'player_id': i % n + 1, 'player_name': 'Owner 0', 'email': 'owner0@bench.local',
+        'st_date': date.today() + timedelta(days=i // 16), 'start_time': dtime(6 + i % 16),
+        'end_time': dtime(7 + i % 16), 'duration': 1, 'pay_method': 'cash', 'total_amount': 10
+    } for i in range(n)])
+    db.session.execute(insert(Review), [{
+        'venue_id': 1, 'user_id': i % n + 1, 'rating': i % 5 + 1, 'comment': 'bench'
+    } for i in range(n)])
+    db.session.commit()
+
+
+def run_benchmark(n):
+    """Seed the database and check every endpoint against its budget"""
+    print(f"🚀 Query count benchmark with {n} rows per table\n")
+    app = create_app(TEST_CONFIG)
+    with app.app_context():
+        db.create_all()
+        # Search through the full-text index, as migrate.py sets it up
+        ensure_search_index()
+        seed(n)
+
+    client = app.test_client()
+    # Log in as the first seeded user for /api/bookings
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+        session['_fresh'] = True
+
+    failures = 0
+    for endpoint, budget in QUERY_BUDGETS.items():
+        started = time.perf_counter()
+        response = client.get(endpoint)
+        elapsed = (time.perf_counter() - started) * 1000
+        queries = int(response.headers.get(QUERY_COUNT_HEADER, -1))
+        ok = response.status_code == 200 and queries <= budget
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {endpoint:32} {len(response.json):6} rows "
+              f"{queries:4} queries (budget {budget}) {elapsed:8.1f} ms")
+
+    return failures == 0
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    sys.exit(0 if run_benchmark(rows) else 1)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark for the venue and booking lists.
+
+Seeds an in-memory database with N rows per table and times building the
+full JSON body of each list three ways:
+
+- orm:      ORM entities, to_dict and the stdlib json encoder (the old path)
+- columns:  columns_query row tuples and the stdlib encoder
+- orjson:   columns_query row tuples and orjson (skipped if not installed)
+
+Each path is checked to produce the same data as the ORM path.
+
+Usage: python benchmarks/serialization.py [N]
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serialization
+from app import create_app
+from models import db, Venue, Booking
+from query_counts import TEST_CONFIG, seed
+from serialization import dumps, rows_to_dicts, with_serialize_options
+
+REPEAT = 3
+
+
+def orm_body(model, order):
+    rows = with_serialize_options(model.query, model).order_by(*order).all()
+    return json.dumps([row.to_dict() for row in rows], sort_keys=True, separators=(',', ':')).encode()
+
+
+def columns_body(model, order):
+    return dumps(rows_to_dicts(model.columns_query().order_by(*order).all()))
+
+
+def stdlib_columns_body(model, order):
+    fast, serialization.orjson = serialization.orjson, None
+    try:
+        return columns_body(model, order)
+    finally:
+        serialization.orjson = fast
+
+
+def best_time(build):
+    """Fastest of REPEAT runs in ms, with a fresh session each time"""
+    best, body = None, None
+    for _ in range(REPEAT):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        body = build()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, body
+
+
+def run_benchmark(n):
+    print(f"🚀 Serialization benchmark with {n} rows per table\n")
+    app = create_app(TEST_CONFIG)
+    paths = [('columns', stdlib_columns_body)]
+    if serialization.orjson is not None:
+        paths.append(('orjson', columns_body))
+    else:
+        print("⚠️  orjson not installed, only the stdlib encoder is compared\n")
+
+    ok = True
+    with app.app_context():
+        db.create_all()
+        seed(n)
+        lists = {
+            'venues': (Venue, (Venue.created_at, Venue.v_no)),
+            'bookings': (Booking, (Booking.st_date.desc(), Booking.start_time.desc(), Booking.Bno.desc())),
+        }
+        for name, (model, order) in lists.items():
+            baseline, expected = best_time(lambda: orm_body(model, order))
+            print(f"{name:9} orm      {baseline:8.1f} ms  {len(expected) // 1024:6} KiB")
+            for label, build in paths:
+                elapsed, body = best_time(lambda: build(model, order))
+                same = json.loads(body) == json.loads(expected)
+                ok &= same
+                print(f"{name:9} {label:8} {elapsed:8.1f} ms  {baseline / elapsed:5.1f}x faster"
+                      f"{'' if same else '  ❌ output differs from to_dict'}")
+            print()
+    return ok
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    sys.exit(0 if run_benchmark(rows) else 1)
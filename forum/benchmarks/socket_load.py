@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Socket.IO load test across server processes.
+
+For each worker count, starts that many app servers on consecutive ports,
+all sharing one message queue, and spreads the clients over them
+round-robin. Every client joins the same venue room; an external process
+then publishes venue_update events to the queue, the way the outbox worker
+does, and the test waits until every client has received every event.
+
+Reports per worker count the clients connected and how long that took,
+deliveries per second, and delivery latency.
+
+The queue is a local relay (message_queue.py) started by the test, or the
+one given with --queue (e.g. redis://localhost:6379/0). Clients speak the
+Socket.IO protocol directly over simple-websocket, which Flask-SocketIO
+already depends on.
+
+Worker processes compete with the client processes for CPU, so run it on
+a machine with more cores than workers to see throughput scale.
+
+Usage: python benchmarks/socket_load.py [--workers 1,2,4] [--clients 200]
+                                        [--messages 50] [--client-processes N]
+                                        [--queue URL]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import simple_websocket
+
+from message_queue import QueueRelay, client_manager
+
+BASE_PORT = 5101
+VENUE_ROOM = 'venue_1'
+
+
+def serve(port, queue_url, async_mode):
+    """Run one app server; started as a subprocess by the test"""
+    from app import create_app
+    from query_counts import TEST_CONFIG
+    from socket_manager import socketio
+
+    app = create_app({**TEST_CONFIG, 'SOCKETIO_MESSAGE_QUEUE': queue_url, 'SOCKETIO_ASYNC_MODE': async_mode})
+    socketio.run(app, host='127.0.0.1', port=port, log_output=False, allow_unsafe_werkzeug=True)
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+class LoadClient(threading.Thread):
+    """One Socket.IO client over a websocket, watching the venue room"""
+
+    def __init__(self, port, expected):
+        super().__init__(daemon=True)
+        self.url = f'127.0.0.1:{port}/socket.io/?EIO=4'
+        self.expected = expected
+        self.joined = threading.Event()
+        self.done = threading.Event()
+        self.latencies = []
+        self.finished = 0.0
+        self.error = None
+
+    def run(self):
+        try:
+            # Open the engine.io session over HTTP, then upgrade it. A packet sent
+            # by the server right after the websocket handshake can sit unread in
+            # simple-websocket's buffer, so the client speaks first on the socket.
+            with urllib.request.urlopen(f'http://{self.url}&transport=polling') as response:
+                sid = json.loads(response.read().decode()[1:])['sid']
+            ws = simple_websocket.Client.connect(f'ws://{self.url}&transport=websocket&sid={sid}')
+            ws.send('2probe')
+            ws.receive()                                  # 3probe
+            ws.send('5')                                  # upgrade
+            ws.send('40')                                 # socket.io connect
+            ws.receive()                                  # connect ack, before any event
+            ws.send('42' + json.dumps(['join_venue', {'venue_id': 1}]))
+            while len(self.latencies) < self.expected:
+                packet = ws.receive()
+                if packet == '2':
+                    ws.send('3')                          # pong
+                elif packet.startswith('42'):
+                    name, data = json.loads(packet[2:])[:2]
+                    if name == 'joined_venue':
+                        self.joined.set()
+                    elif name == 'venue_update':
+                        self.finished = time.time()
+                        self.latencies.append(self.finished - data['sent'])
+            ws.close()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.joined.set()
+            self.done.set()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def client_process(ports, count, offset, messages, timeout, results):
+    """Run `count` clients in this process and report to the results queue"""
+    started = time.perf_counter()
+    clients = [LoadClient(ports[(offset + i) % len(ports)], messages) for i in range(count)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.joined.wait(30)
+    connected = sum(1 for c in clients if c.error is None)
+    results.put((connected, time.perf_counter() - started))
+
+    deadline = time.time() + timeout
+    for client in clients:
+        client.done.wait(max(0, deadline - time.time()))
+    results.put(([l for c in clients for l in c.latencies], max(c.finished for c in clients)))
+
+
+def run_round(workers, args, queue_url):
+    ports = [BASE_PORT + i for i in range(workers)]
+    servers = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port),
+                          '--queue', queue_url, '--async-mode', args.async_mode],
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for port in ports
+    ]
+    loaders = []
+    try:
+        if not all(wait_for_port(port) for port in ports):
+            print("❌ Servers did not start")
+            return False
+
+        # Clients run in their own processes so the load generator is not the bottleneck
+        results = multiprocessing.Queue()
+        shares = [args.clients // args.client_processes + (i < args.clients % args.client_processes)
+                  for i in range(args.client_processes)]
+        loaders = [
+            multiprocessing.Process(target=client_process,
+                                    args=(ports, share, sum(shares[:i]), args.messages, args.timeout, results))
+            for i, share in enumerate(shares)
+        ]
+        for loader in loaders:
+            loader.start()
+        joined = [results.get(timeout=60) for _ in loaders]
+        connected = sum(n for n, _ in joined)
+        connect_s = max(elapsed for _, elapsed in joined)
+
+        # Publish the way a separate process (outbox worker, another server) would
+        emitter = client_manager(queue_url, write_only=True)
+        started = time.time()
+        for seq in range(args.messages):
+            payload = {'venue_id': 1, 'type': 'load_test', 'seq': seq, 'sent': time.time()}
+            emitter.emit('venue_update', payload, room=VENUE_ROOM)
+        done = [results.get(timeout=args.timeout + 30) for _ in loaders]
+        latencies = [l for received, _ in done for l in received]
+        elapsed = max(finished for _, finished in done) - started
+
+        expected = connected * args.messages
+        print(f"workers={workers:<3} clients={connected}/{args.clients} connect={connect_s:6.2f}s  "
+              f"delivered={len(latencies)}/{expected}  {len(latencies) / elapsed:9.0f} msg/s  "
+              f"p50={percentile(latencies, 0.5) * 1000:6.1f}ms  p99={percentile(latencies, 0.99) * 1000:6.1f}ms")
+        return len(latencies) == expected and connected == args.clients
+    finally:
+        for process in loaders + servers:
+            process.terminate()
+        for loader in loaders:
+            loader.join()
+        for server in servers:
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--messages', type=int, default=50)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--client-processes', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--queue', help='message queue url (default: a local relay)')
+    parser.add_argument('--async-mode', default='threading')
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.queue, args.async_mode)
+        return True
+
+    queue_url = args.queue
+    if not queue_url:
+        relay = QueueRelay(('127.0.0.1', 0))
+        threading.Thread(target=relay.serve_forever, daemon=True).start()
+        queue_url = f'local://127.0.0.1:{relay.server_address[1]}'
+
+    print(f"🚀 Socket.IO load test: {args.clients} clients, {args.messages} broadcasts, queue {queue_url}\n")
+    ok = True
+    for workers in [int(w) for w in args.workers.split(',')]:
+        ok &= run_round(workers, args, queue_url)
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
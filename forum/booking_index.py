@@ -0,0 +1,237 @@
+"""
+In-memory interval index of active bookings.
+
+The index keeps the pending and confirmed bookings of each (venue, date)
+as intervals sorted by start minute, so "is [start, end) free at this
+venue on this day?" is a binary search.
+
+The index only sees the commits of its own process, so a cached answer
+can be stale in either direction: a slot booked by another process looks
+free, and one cancelled there still looks taken until the day expires.
+create_booking therefore decides with confirm_free alone, which reads the
+day from the database in the booking's transaction and refreshes the
+cache. To keep two bookings of the same day from both seeing it free, it
+first locks the day's venue_daily_stats row (creating it if needed), so
+they queue on a row that always exists instead of on booking rows, which
+a day without bookings has none of.
+
+Changes are collected from the Booking mapper events and applied only
+after the surrounding transaction commits, so rolled back writes never
+reach the index. A day that is not cached yet (or has expired) is loaded
+with a single query over the (venue_id, st_date, status) index.
+"""
+
+import threading
+import time as _time
+from bisect import bisect_left, insort
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models import db, Booking, VenueDailyStats
+from rollups import upsert_add
+
+ACTIVE_STATUSES = ('pending', 'confirmed')
+MINUTES_PER_DAY = 24 * 60
+
+_PENDING_KEY = 'booking_index_changes'
+_STALE_KEY = 'booking_index_stale_days'
+
+
+def to_minutes(value):
+    """Minutes since midnight for a datetime.time"""
+    return value.hour * 60 + value.minute
+
+
+def interval_minutes(start_time, end_time):
+    """Return (start, end) in minutes, extending slots that run past midnight"""
+    start = to_minutes(start_time)
+    end = to_minutes(end_time)
+    if end <= start:
+        end += MINUTES_PER_DAY
+    return start, end
+
+
+class _DaySlots:
+    """Sorted intervals of one venue on one day"""
+
+    __slots__ = ('intervals', 'starts', 'max_end', 'loaded_at')
+
+    def __init__(self, intervals, loaded_at):
+        self.intervals = sorted(intervals)
+        self.loaded_at = loaded_at
+        self._reindex()
+
+    def _reindex(self):
+        # max_end[i] is the furthest end among the first i + 1 intervals, which
+        # keeps the overlap check logarithmic even if legacy rows overlap
+        self.starts = [start for start, _, _ in self.intervals]
+        self.max_end = []
+        furthest = 0
+        for _, end, _ in self.intervals:
+            furthest = max(furthest, end)
+            self.max_end.append(furthest)
+
+    def add(self, start, end, booking_id):
+        self.intervals = [iv for iv in self.intervals if iv[2] != booking_id]
+        insort(self.intervals, (start, end, booking_id))
+        self._reindex()
+
+    def discard(self, booking_id):
+        remaining = [iv for iv in self.intervals if iv[2] != booking_id]
+        if len(remaining) != len(self.intervals):
+            self.intervals = remaining
+            self._reindex()
+
+    def overlaps(self, start, end):
+        # Only intervals starting before `end` can overlap; one of them does
+        # if the furthest reaching of them ends after `start`
+        idx = bisect_left(self.starts, end)
+        return idx > 0 and self.max_end[idx - 1] > start
+
+
+class BookingIndex:
+    """Per-process cache of booked intervals keyed by (venue_id, date)"""
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._days = {}
+        self._locations = {}  # booking id -> (venue_id, date) it is indexed under
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('BOOKING_INDEX_TTL', self.ttl)
+
+    def _cached_day(self, key):
+        slots = self._days.get(key)
+        if slots is not None and _time.monotonic() - slots.loaded_at > self.ttl:
+            self._drop_day(key)
+            return None
+        return slots
+
+    def _drop_day(self, key):
+        slots = self._days.pop(key, None)
+        if slots is not None:
+            for _, _, booking_id in slots.intervals:
+                self._locations.pop(booking_id, None)
+
+    def _load_day(self, venue_id, day, lock=False):
+        query = (
+            db.session.query(Booking.start_time, Booking.end_time, Booking.Bno)
+            .filter(
+                Booking.venue_id == venue_id,
+                Booking.st_date == day,
+                Booking.status.in_(ACTIVE_STATUSES)
+            )
+        )
+        if lock:
+            query = query.with_for_update()
+        rows = query.all()
+        intervals = [interval_minutes(r.start_time, r.end_time) + (r.Bno,) for r in rows]
+        slots = _DaySlots(intervals, _time.monotonic())
+        key = (venue_id, day)
+        with self._lock:
+            self._drop_day(key)
+            self._days[key] = slots
+            for _, _, booking_id in slots.intervals:
+                self._locations[booking_id] = key
+        return slots
+
+    def is_free(self, venue_id, day, start_time, end_time):
+        """
+        Return True if no active booking overlaps [start_time, end_time),
+        from the cache when the day is loaded. Advisory only, see confirm_free.
+        """
+        start, end = interval_minutes(start_time, end_time)
+        key = (venue_id, day)
+        with self._lock:
+            slots = self._cached_day(key)
+            if slots is not None:
+                return not slots.overlaps(start, end)
+        return not self._load_day(venue_id, day).overlaps(start, end)
+
+    def confirm_free(self, venue_id, day, start_time, end_time):
+        """
+        Check the slot against the database in the current transaction and
+        refresh the cached day. The day's venue_daily_stats row stays locked
+        until commit, so a concurrent booking of the same day waits for this
+        one and then reads the bookings it committed.
+        """
+        # A no-op upsert: it takes the row's write lock, creating the row if missing
+        upsert_add(db.session.connection(), VenueDailyStats.__table__,
+                   {'venue_id': venue_id, 'day': day}, {'bookings': 0})
+        start, end = interval_minutes(start_time, end_time)
+        return not self._load_day(venue_id, day, lock=True).overlaps(start, end)
+
+    def apply(self, venue_id, day, start_time, end_time, booking_id, status):
+        """Record the committed state of a booking"""
+        with self._lock:
+            previous = self._locations.pop(booking_id, None)
+            if previous is not None and previous in self._days:
+                self._days[previous].discard(booking_id)
+
+            if status not in ACTIVE_STATUSES:
+                return
+            key = (venue_id, day)
+            slots = self._cached_day(key)
+            if slots is None:
+                # Day not cached, it will be loaded from the database on demand
+                return
+            start, end = interval_minutes(start_time, end_time)
+            slots.add(start, end, booking_id)
+            self._locations[booking_id] = key
+
+    def forget_day(self, venue_id, day):
+        """Drop a cached day so it is loaded again on demand"""
+        with self._lock:
+            self._drop_day((venue_id, day))
+
+    def clear(self):
+        with self._lock:
+            self._days.clear()
+            self._locations.clear()
+
+
+booking_index = BookingIndex()
+
+
+# Keep the index in sync with committed booking writes
+@event.listens_for(Booking, 'after_insert')
+@event.listens_for(Booking, 'after_update')
+def _queue_booking_change(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, []).append((
+            target.venue_id, target.st_date, target.start_time,
+            target.end_time, target.Bno, target.status
+        ))
+
+@event.listens_for(Booking, 'after_delete')
+def _queue_booking_delete(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, []).append((
+            target.venue_id, target.st_date, target.start_time,
+            target.end_time, target.Bno, None
+        ))
+
+@event.listens_for(Session, 'after_commit')
+def _apply_booking_changes(session):
+    # Releasing a savepoint fires this too; wait for the outermost commit
+    if session.get_nested_transaction() is not None:
+        return
+    for change in session.info.pop(_PENDING_KEY, []):
+        booking_index.apply(*change)
+    for venue_id, day in session.info.pop(_STALE_KEY, ()):
+        booking_index.forget_day(venue_id, day)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_booking_changes(session, previous_transaction):
+    if previous_transaction.nested:
+        # Changes undone by a savepoint cannot be told apart from the outer
+        # transaction's, so their days are reloaded after the commit instead
+        stale = session.info.setdefault(_STALE_KEY, set())
+        stale.update((venue_id, day) for venue_id, day, *_ in session.info.get(_PENDING_KEY, []))
+        return
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_STALE_KEY, None)
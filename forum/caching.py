@@ -0,0 +1,81 @@
+"""
+Small in-process caches shared by the API.
+
+TTLCache is a bounded, thread-safe LRU map whose entries also expire after
+a fixed number of seconds. It is meant for hot lookups that tolerate short
+staleness and are explicitly invalidated on writes.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry"""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, key, now):
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            return _MISSING
+        expires_at, value = entry
+        if expires_at <= now:
+            del self._data[key]
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._lookup(key, time.monotonic())
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def get_many(self, keys):
+        """Return a dict of the keys that are cached and fresh"""
+        found = {}
+        with self._lock:
+            now = time.monotonic()
+            for key in keys:
+                value = self._lookup(key, now)
+                if value is _MISSING:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    found[key] = value
+        return found
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def set_many(self, items, ttl=None):
+        for key, value in items.items():
+            self.set(key, value, ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -31,6 +31,64 @@ class Config:
         'max_overflow': 0
     }
     
+    # Seconds a venue's cached booking intervals stay valid before being reloaded
+    BOOKING_INDEX_TTL = int(os.getenv('BOOKING_INDEX_TTL', '300'))
+    
+    # Authenticated users cached per process instead of loaded on every request
+    IDENTITY_CACHE_SIZE = int(os.getenv('IDENTITY_CACHE_SIZE', '10000'))
+    IDENTITY_CACHE_TTL = int(os.getenv('IDENTITY_CACHE_TTL', '60'))
+    # Seconds between checks for users changed by other processes
+    IDENTITY_SYNC_INTERVAL = float(os.getenv('IDENTITY_SYNC_INTERVAL', '1.0'))
+    
+    # bcrypt cost; stored hashes are upgraded on login when it changes
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', '12'))
+    # Password hashing process pool: workers (0 = inline), max calls in flight
+    # before answering 503, seconds to wait for a result, Retry-After seconds
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+    PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', '8'))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', '10'))
+    PASSWORD_HASH_RETRY_AFTER = int(os.getenv('PASSWORD_HASH_RETRY_AFTER', '1'))
+    
+    # Keyset pagination page sizes for list endpoints
+    PAGE_SIZE_DEFAULT = int(os.getenv('PAGE_SIZE_DEFAULT', '100'))
+    PAGE_SIZE_MAX = int(os.getenv('PAGE_SIZE_MAX', '500'))
+    # Fetches per page when rows are filtered in Python (venue availability searches)
+    PAGE_MAX_BATCHES = int(os.getenv('PAGE_MAX_BATCHES', '5'))
+    
+    # Outbox worker draining side effects (notifications, broadcasts) of writes
+    # (a thread in each app process unless OUTBOX_WORKER is off, or `python outbox.py`)
+    OUTBOX_WORKER = os.getenv('OUTBOX_WORKER', 'true').lower() == 'true'
+    OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '100'))
+    OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', '1.0'))
+    OUTBOX_LEASE_SECONDS = int(os.getenv('OUTBOX_LEASE_SECONDS', '60'))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '5'))
+    
+    # Cache for public GET responses: 'memory' (per process), 'redis' (shared) or 'none'
+    RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '60'))
+    RESPONSE_CACHE_MAXSIZE = int(os.getenv('RESPONSE_CACHE_MAXSIZE', '2048'))
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    
+    # Socket.IO fan-out across server processes: '' (single process), redis://...
+    # or local://host:port (python message_queue.py); async mode threading, eventlet or gevent
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE', '')
+    SOCKETIO_ASYNC_MODE = os.getenv('SOCKETIO_ASYNC_MODE', 'threading')
+    
+    # Online users: 'memory' (per process) or 'redis' (shared); connections not
+    # refreshed by their process for PRESENCE_TTL seconds count as gone
+    PRESENCE_BACKEND = os.getenv('PRESENCE_BACKEND', 'memory')
+    PRESENCE_TTL = int(os.getenv('PRESENCE_TTL', '60'))
+    PRESENCE_HEARTBEAT_INTERVAL = int(os.getenv('PRESENCE_HEARTBEAT_INTERVAL', '20'))
+    
+    # venue_update messages: milliseconds to merge a room's updates (0 = send at once)
+    VENUE_UPDATE_WINDOW_MS = int(os.getenv('VENUE_UPDATE_WINDOW_MS', '100'))
+    
+    # Notifications: rows per multi-row INSERT when a transaction stores them
+    NOTIFICATION_BATCH_SIZE = int(os.getenv('NOTIFICATION_BATCH_SIZE', '1000'))
+    
+    # Append every SQL statement to this file for benchmarks/explain_plans.py
+    QUERY_LOG_PATH = os.getenv('QUERY_LOG_PATH')
+    
     # Flask Configuration
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-super-secret-key-change-this-in-production')
     FLASK_ENV = os.getenv('FLASK_ENV', 'development')
@@ -0,0 +1,194 @@
+"""
+Strong ETags from per-resource version counters.
+
+Every flush that writes venues, reviews, bookings, payments, matches or
+user names bumps the resource_version rows of the tags it affects. A
+response's ETag is a hash of the request key and the versions of its tags,
+so checking If-None-Match costs a single primary key lookup and a 304
+never loads or serializes the rows.
+
+Per-resource tags (venue:1, bookings:5) are bumped in the same transaction
+as the write. Global tags (availability, venues, ...) are shared by every
+write, and holding their rows locked until commit would serialize all
+bookings on MySQL, so they are bumped right after the commit in a
+transaction of their own, like the response cache is invalidated.
+
+Tags are the ones used by the response cache (response_cache.py). Under
+@etag, the cache key carries the ETag, so a cached body is only ever sent
+with the ETag of the versions it was rendered at, whichever process
+cached it.
+"""
+
+import hashlib
+from functools import wraps
+
+from flask import current_app, g, request
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from models import db, Login, Venue, Review, Booking, Payment, Match, ResourceVersion, _confirmed_contribution
+from response_cache import (request_key, VENUES, MATCHES, USERS, AVAILABILITY, VENUE_NAMES,
+                            venue_tag, reviews_tag, bookings_tag)
+from rollups import upsert_add_many
+
+_VENUE_NAME_FIELDS = ('court_name', 'address')
+GLOBAL_TAGS = frozenset({VENUES, MATCHES, USERS, AVAILABILITY, VENUE_NAMES})
+_PENDING_KEY = 'etags_global_tags'
+
+
+def versions(tags):
+    """Current version of each tag, 0 for tags never written"""
+    rows = db.session.query(ResourceVersion.name, ResourceVersion.version).filter(ResourceVersion.name.in_(tags))
+    found = dict(rows)
+    return [found.get(tag, 0) for tag in tags]
+
+
+def compute_etag(tags):
+    raw = request_key() + '|' + ','.join(f'{tag}={v}' for tag, v in zip(tags, versions(tags)))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def etag(tags):
+    """
+    Send a strong ETag with the view's 200 responses and answer matching
+    If-None-Match requests with 304 without running the view.
+
+    `tags` is a list, or a callable receiving the view arguments and
+    returning one, like for response_cache.cached.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**view_args):
+            tag_list = tags(**view_args) if callable(tags) else tags
+            value = compute_etag(tag_list)
+            g.etag = value
+            if request.if_none_match.contains(value):
+                response = current_app.response_class(status=304)
+                response.set_etag(value)
+                return response
+
+            response = current_app.make_response(view(**view_args))
+            if response.status_code == 200:
+                response.set_etag(value)
+            return response
+        return wrapper
+    return decorator
+
+
+def _changed(obj, *fields):
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+def _old_and_new(obj, field):
+    """Distinct values an attribute had before and after the flush"""
+    history = inspect(obj).attrs[field].history
+    values = {getattr(obj, field)}
+    values.update(history.deleted)
+    return values - {None}
+
+
+def _owners_of(connection, venue_ids):
+    if not venue_ids:
+        return set()
+    return set(connection.execute(select(Venue.user_id).where(Venue.v_no.in_(venue_ids))).scalars())
+
+
+def _venue_tags(venue_ids):
+    return {VENUES, *[venue_tag(v) for v in venue_ids]}
+
+
+def _booking_tags(connection, booking, created_or_deleted):
+    """Tags affected by a booking write"""
+    venue_ids = _old_and_new(booking, 'venue_id')
+    player_ids = _old_and_new(booking, 'player_id')
+    tags = {AVAILABILITY}
+    tags.update(bookings_tag(user_id) for user_id in player_ids | _owners_of(connection, venue_ids))
+    if created_or_deleted:
+        return tags
+    # Confirmed bookings are counted in the venue's total_bookings and total_revenue
+    state = inspect(booking)
+    old = _confirmed_contribution(*[
+        state.attrs[f].history.deleted[0] if state.attrs[f].history.deleted else getattr(booking, f)
+        for f in ('status', 'total_amount')
+    ])
+    new = _confirmed_contribution(booking.status, booking.total_amount)
+    if old != new or (new[0] and _changed(booking, 'venue_id')):
+        tags |= _venue_tags(venue_ids)
+    return tags
+
+
+def _tags_for(connection, obj, created_or_deleted):
+    if isinstance(obj, Venue):
+        if created_or_deleted:
+            return _venue_tags([obj.v_no]) | {VENUE_NAMES}
+        tags = _venue_tags([obj.v_no])
+        if _changed(obj, *_VENUE_NAME_FIELDS):
+            tags.add(VENUE_NAMES)
+        return tags
+    if isinstance(obj, Review):
+        # Every review write also moves the venue's rating aggregates
+        venue_ids = _old_and_new(obj, 'venue_id')
+        return _venue_tags(venue_ids) | {reviews_tag(v) for v in venue_ids}
+    if isinstance(obj, Booking):
+        tags = _booking_tags(connection, obj, created_or_deleted)
+        if created_or_deleted and _confirmed_contribution(obj.status, obj.total_amount)[0]:
+            tags |= _venue_tags([obj.venue_id])
+        return tags
+    if isinstance(obj, Payment):
+        booking = connection.execute(
+            select(Booking.venue_id, Booking.player_id).where(Booking.Bno == obj.booking_id)
+        ).first()
+        if booking is None:
+            return set()
+        return {bookings_tag(booking.player_id)} | {bookings_tag(u) for u in _owners_of(connection, [booking.venue_id])}
+    if isinstance(obj, Match):
+        return {MATCHES}
+    if isinstance(obj, Login) and not created_or_deleted and _changed(obj, 'fullname'):
+        return {USERS}
+    return set()
+
+
+@event.listens_for(db.session, 'after_flush')
+def bump_resource_versions(session, flush_context):
+    """Bump the version of every tag touched by this flush"""
+    written = [(obj, True) for obj in list(session.new) + list(session.deleted)]
+    written += [(obj, False) for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    if not written:
+        return
+
+    # Versions live in the primary database, even when only matches were written
+    connection = session.connection(bind_arguments={'mapper': ResourceVersion.__mapper__})
+    tags = set()
+    for obj, created_or_deleted in written:
+        tags |= _tags_for(connection, obj, created_or_deleted)
+    session.info.setdefault(_PENDING_KEY, set()).update(tags & GLOBAL_TAGS)
+    _bump(connection, tags - GLOBAL_TAGS)
+
+
+def _bump(connection, tags):
+    # Sorted, so concurrent transactions lock the rows in the same order
+    upsert_add_many(connection, ResourceVersion.__table__, ['name'],
+                    [{'name': tag, 'version': 1} for tag in sorted(tags)])
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_global_tags(session):
+    # Releasing a savepoint fires this too, before anything is visible to others
+    if session.get_nested_transaction() is not None:
+        return
+    tags = session.info.pop(_PENDING_KEY, None)
+    if not tags:
+        return
+    try:
+        with session.get_bind(mapper=ResourceVersion.__mapper__).begin() as connection:
+            _bump(connection, tags)
+    except Exception as e:
+        print(f"Error bumping resource versions {sorted(tags)}: {e}")
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_global_tags(session, previous_transaction):
+    # A rolled back savepoint keeps them: bumping a tag too often only costs a 200
+    if not previous_transaction.nested:
+        session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,122 @@
+"""
+Cache of authenticated user identities.
+
+Flask-Login calls load_user on every @login_required request and socket
+connect. Instead of querying the login table each time, the user is kept
+as a Principal: a plain snapshot of the row's public fields, detached from
+any session, so it can be shared between requests and threads.
+
+Entries expire after IDENTITY_CACHE_TTL seconds and the cache holds at most
+IDENTITY_CACHE_SIZE users. Committed updates or deletes of a login row
+drop its entry (profile edits, deactivation), as does logout. Routes that
+change a user load the Login row itself; principals are read-only.
+
+Other processes learn about the change through the "identities"
+resource_version row, bumped in the same transaction as the login write.
+Each process reads it at most every IDENTITY_SYNC_INTERVAL seconds and
+clears its cache when it moved, so a deactivated user is locked out
+everywhere within that interval.
+"""
+
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from caching import TTLCache
+from models import db, Login, ResourceVersion
+from rollups import upsert_add
+
+IDENTITIES = 'identities'
+_PENDING_KEY = 'identity_cache_invalidations'
+
+
+class Principal:
+    """Read-only view of a Login row, enough for authorization checks"""
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, fields):
+        self._fields = fields
+        self.__dict__.update(fields)
+
+    def get_id(self):
+        return str(self.sr_no)
+
+    def to_dict(self):
+        return dict(self._fields)
+
+    def __repr__(self):
+        return f'<Principal {self.sr_no}>'
+
+
+class IdentityCache:
+    """Per-process TTL cache of principals keyed by user id"""
+
+    def __init__(self, maxsize=10000, ttl=60):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.sync_interval = 1.0
+        self._version = None
+        self._synced_at = float('-inf')
+
+    def init_app(self, app):
+        self._cache = TTLCache(
+            maxsize=app.config.get('IDENTITY_CACHE_SIZE', self._cache.maxsize),
+            ttl=app.config.get('IDENTITY_CACHE_TTL', self._cache.ttl)
+        )
+        self.sync_interval = app.config.get('IDENTITY_SYNC_INTERVAL', self.sync_interval)
+        self._version = None
+        self._synced_at = float('-inf')
+
+    def _sync(self):
+        """Clear the cache if any process changed a user since the last check"""
+        now = time.monotonic()
+        if now - self._synced_at < self.sync_interval:
+            return
+        self._synced_at = now
+        version = db.session.query(ResourceVersion.version).filter_by(name=IDENTITIES).scalar() or 0
+        if version != self._version:
+            self._cache.clear()
+            self._version = version
+
+    def load(self, user_id):
+        """Principal for user_id, or None if the user does not exist"""
+        self._sync()
+        principal = self._cache.get(user_id)
+        if principal is None:
+            user = db.session.get(Login, user_id)
+            if user is None:
+                return None
+            principal = Principal(user.to_dict())
+            self._cache.set(user_id, principal)
+        return principal
+
+    def invalidate(self, user_id):
+        self._cache.delete(user_id)
+
+    def clear(self):
+        self._cache.clear()
+
+
+identity_cache = IdentityCache()
+
+
+# Drop principals of login rows changed by a committed transaction
+@event.listens_for(Login, 'after_update')
+@event.listens_for(Login, 'after_delete')
+def _queue_invalidation(mapper, connection, target):
+    # Tells the other processes to drop their principals
+    upsert_add(connection, ResourceVersion.__table__, {'name': IDENTITIES}, {'version': 1})
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, set()).add(target.sr_no)
+
+@event.listens_for(Session, 'after_commit')
+def _apply_invalidations(session):
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        identity_cache.invalidate(user_id)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_invalidations(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
@@ -1,5 +1,6 @@
 from app import create_app
 from models import db, Login, Venue, VenueAvailability, VenueImage, Booking, Payment, Review, Notification
+from search_index import ensure_search_index
 from flask_bcrypt import Bcrypt
 from datetime import datetime, date, time, timedelta
 import random
@@ -11,6 +12,7 @@ def init_database():
     with app.app_context():
         # Create all tables
         db.create_all()
+        ensure_search_index()
         print("✅ Database tables created successfully!")
         
         # Initialize bcrypt
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Message queue for Socket.IO fan-out across processes.
+
+Without a queue, socketio.emit only reaches clients connected to the
+process that calls it. With one, every process publishes its emits to the
+queue and delivers the ones published by the others to its own clients,
+so send_notification or broadcast_venue_update reaches a client whichever
+worker it is connected to, including emits from `python outbox.py`.
+
+SOCKETIO_MESSAGE_QUEUE selects the backend:
+
+- empty: no queue, a single server process
+- redis://host:port/db: Redis pub/sub, for several hosts
+- local://host:port: the relay in this module, for several processes on
+  one host without Redis. Start it with `python message_queue.py [port]`
+- anything else is passed to Kombu (amqp://...)
+"""
+
+import json
+import logging
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+import socketio
+
+DEFAULT_PORT = 5555
+CHANNEL = 'flask-socketio'
+
+logger = logging.getLogger(__name__)
+
+
+def _address(url):
+    parsed = urlparse(url)
+    return parsed.hostname or 'localhost', parsed.port or DEFAULT_PORT
+
+
+def client_manager(url, channel=CHANNEL, write_only=False):
+    """Socket.IO client manager for a SOCKETIO_MESSAGE_QUEUE url, None for no queue"""
+    if not url:
+        return None
+    if url.startswith('local://'):
+        return LocalQueueManager(url, channel=channel, write_only=write_only)
+    if url.startswith(('redis://', 'rediss://')):
+        return socketio.RedisManager(url, channel=channel, write_only=write_only)
+    return socketio.KombuManager(url, channel=channel, write_only=write_only)
+
+
+class LocalQueueManager(socketio.PubSubManager):
+    """Client manager publishing through a QueueRelay over TCP"""
+
+    name = 'local'
+
+    def __init__(self, url='local://localhost:5555', channel=CHANNEL, write_only=False, logger=None, json=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self.address = _address(url)
+        self._sink = None
+        self._sink_lock = threading.Lock()
+
+    def _connect(self, subscribe):
+        conn = socket.create_connection(self.address, timeout=5)
+        conn.settimeout(None)
+        conn.sendall(json.dumps({'subscribe': subscribe}).encode() + b'\n')
+        return conn
+
+    def _close_sink(self):
+        if self._sink is not None:
+            self._sink.close()
+            self._sink = None
+
+    def _publish(self, data):
+        line = self.json.dumps({'channel': self.channel, 'data': data}).encode() + b'\n'
+        with self._sink_lock:
+            # One reconnect, in case the relay was restarted since the last publish
+            for attempt in range(2):
+                try:
+                    if self._sink is None:
+                        self._sink = self._connect(subscribe=False)
+                    self._sink.sendall(line)
+                    return
+                except OSError:
+                    self._close_sink()
+                    if attempt:
+                        raise
+
+    def _listen(self):
+        retry_sleep = 1
+        while True:
+            try:
+                with self._connect(subscribe=True) as conn, conn.makefile('rb') as stream:
+                    retry_sleep = 1
+                    for line in stream:
+                        message = self.json.loads(line)
+                        if message.get('channel') == self.channel:
+                            yield message['data']
+            except OSError as e:
+                self._get_logger().error(f'Cannot receive from the message relay, retrying in {retry_sleep} secs: {e}')
+            time.sleep(retry_sleep)
+            retry_sleep = min(retry_sleep * 2, 30)
+
+
+class _Subscriber:
+    """Connection of a listening server with its own bounded backlog"""
+
+    def __init__(self, conn, backlog):
+        self.conn = conn
+        self.lines = queue.Queue(backlog)
+
+    def offer(self, line):
+        try:
+            self.lines.put_nowait(line)
+            return True
+        except queue.Full:
+            return False
+
+    def close(self):
+        try:
+            self.conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        # Wake drain() if it is idle; a full backlog means it is already sending
+        self.offer(None)
+
+    def drain(self):
+        while True:
+            line = self.lines.get()
+            if line is None:
+                return
+            self.conn.sendall(line)
+
+
+class _RelayHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        hello = json.loads(self.rfile.readline() or b'{}')
+        if not hello.get('subscribe'):
+            for line in self.rfile:
+                self.server.publish(line)
+            return
+        subscriber = _Subscriber(self.request, self.server.backlog)
+        self.server.subscribe(subscriber)
+        try:
+            subscriber.drain()
+        except OSError:
+            pass
+        finally:
+            self.server.unsubscribe(subscriber)
+
+
+class QueueRelay(socketserver.ThreadingTCPServer):
+    """
+    Relays every line published by a server to all subscribed servers.
+
+    Each subscriber has a backlog of `backlog` lines; one that falls that
+    far behind is disconnected rather than slowing down the others, and
+    resubscribes on its own.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', DEFAULT_PORT), backlog=10000):
+        super().__init__(address, _RelayHandler)
+        self.backlog = backlog
+        self.relayed = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.add(subscriber)
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, line):
+        with self._lock:
+            self.relayed += 1
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            if not subscriber.offer(line):
+                logger.warning('Dropping a message relay subscriber that fell behind')
+                self.unsubscribe(subscriber)
+                subscriber.close()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    relay = QueueRelay(('127.0.0.1', port))
+    print(f"🚀 Socket.IO message relay on local://127.0.0.1:{port}")
+    try:
+        relay.serve_forever()
+    except KeyboardInterrupt:
+        relay.shutdown()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Bring an existing database up to date with the current models.
+
+db.create_all() only creates tables that are missing; it never adds
+indexes or columns to tables that already exist. Each step below is
+idempotent, so the script can be re-run safely after every update.
+"""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from app import create_app
+from models import (db, Venue, VenueAvailability, VenueSport, VenueAmenity, Booking, Payment, Review, Match, Notification,
+                    DashboardStats, VenueRatingDaily, NotificationStats, split_tags)
+from search_index import ensure_search_index
+from reconcile import (reconcile_ratings, reconcile_dashboard_rollups, reconcile_rating_daily,
+                       reconcile_notification_stats)
+
+
+def create_missing_indexes(model):
+    """Create indexes declared on the model that the database does not have yet"""
+    engine = db.engines[getattr(model, '__bind_key__', None)]
+    existing = {ix['name'] for ix in inspect(engine).get_indexes(model.__tablename__)}
+    created = []
+    for index in model.__table__.indexes:
+        if index.name not in existing:
+            index.create(bind=engine)
+            created.append(index.name)
+    return created
+
+
+def add_missing_columns(model):
+    """Add columns declared on the model that the table does not have yet"""
+    engine = db.engines[getattr(model, '__bind_key__', None)]
+    existing = {col['name'] for col in inspect(engine).get_columns(model.__tablename__)}
+    added = []
+    with engine.begin() as conn:
+        for col in model.__table__.columns:
+            if col.name not in existing:
+                ddl = CreateColumn(col).compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {model.__tablename__} ADD COLUMN {ddl}'))
+                added.append(f'{model.__tablename__}.{col.name}')
+    return added
+
+
+def booking_indexes():
+    """Indexes backing booking conflict checks and booking pagination"""
+    return create_missing_indexes(Booking)
+
+
+def venue_availability_indexes():
+    """Index backing availability searches"""
+    return create_missing_indexes(VenueAvailability)
+
+
+def pagination_indexes():
+    """Indexes backing keyset pagination of venues, reviews and matches"""
+    return (create_missing_indexes(Venue) + create_missing_indexes(Review)
+            + create_missing_indexes(Match))
+
+
+def lookup_indexes():
+    """Indexes for owner, payment, review, notification and match lookups"""
+    return (create_missing_indexes(Venue) + create_missing_indexes(Payment) + create_missing_indexes(Review)
+            + create_missing_indexes(Notification) + create_missing_indexes(Match))
+
+
+def venue_search_index():
+    """Full-text index for venue search"""
+    return ensure_search_index()
+
+
+def venue_tags():
+    """Sports and amenities copied into venue_sport / venue_amenity"""
+    created = []
+    for tag_model, column in ((VenueSport, Venue.sports), (VenueAmenity, Venue.amenities)):
+        existing = set(db.session.query(tag_model.venue_id, tag_model.name))
+        rows = [
+            {'venue_id': v_no, 'name': name}
+            for v_no, value in db.session.query(Venue.v_no, column)
+            for name in split_tags(value)
+            if (v_no, name) not in existing
+        ]
+        if rows:
+            db.session.execute(tag_model.__table__.insert(), rows)
+            created.append(f'{len(rows)} {tag_model.__tablename__} rows')
+    db.session.commit()
+    return created
+
+
+def venue_rating_aggregates():
+    """Venue rating_sum / rating_count columns, backfilled from reviews"""
+    added = add_missing_columns(Venue)
+    if added:
+        reconcile_ratings()
+    return added
+
+
+def dashboard_rollups():
+    """Dashboard rollup tables backfilled from existing bookings"""
+    if db.session.query(DashboardStats).first() is not None:
+        return []
+    return [f'{reconcile_dashboard_rollups()} dashboard_stats rows']
+
+
+def rating_daily_rollup():
+    """Daily venue rating rollup backfilled from existing reviews"""
+    if db.session.query(VenueRatingDaily).first() is not None:
+        return []
+    return [f'{reconcile_rating_daily()} venue_rating_daily rows']
+
+
+def notification_inbox():
+    """Inbox indexes and unread counters backfilled from notifications"""
+    changes = create_missing_indexes(Notification)
+    # Superseded by ix_notifications_user_read_created, which starts with the same columns
+    engine = db.engines[None]
+    if 'ix_notifications_user_read' in {ix['name'] for ix in inspect(engine).get_indexes('notifications')}:
+        with engine.begin() as conn:
+            conn.execute(text('DROP INDEX ix_notifications_user_read' +
+                              (' ON notifications' if engine.dialect.name == 'mysql' else '')))
+        changes.append('dropped ix_notifications_user_read')
+    if db.session.query(NotificationStats).first() is None:
+        changes.append(f'{reconcile_notification_stats()} notification_stats rows')
+    return changes
+
+
+MIGRATIONS = [
+    venue_rating_aggregates,
+    booking_indexes,
+    venue_availability_indexes,
+    pagination_indexes,
+    lookup_indexes,
+    venue_search_index,
+    venue_tags,
+    dashboard_rollups,
+    rating_daily_rollup,
+    notification_inbox,
+]
+
+
+def migrate():
+    # Seeding queries the models, which may not match the schema until migrated
+    app = create_app({'SEED_DEFAULT_DATA': False})
+
+    with app.app_context():
+        db.create_all()
+        print("✅ Missing tables created")
+
+        for step in MIGRATIONS:
+            result = step()
+            detail = f" ({', '.join(result)})" if result else ""
+            print(f"✅ {step.__doc__}{detail}")
+
+        print("\n🎉 Database is up to date!")
+
+
+if __name__ == '__main__':
+    migrate()
@@ -1,9 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime, timedelta
-from sqlalchemy.orm import relationship
-from sqlalchemy import event, func
+from sqlalchemy.orm import relationship, validates
+from sqlalchemy import event, func, case, inspect, update
 import json
+from caching import TTLCache
 
 db = SQLAlchemy()
 
@@ -53,12 +54,19 @@ class Login(db.Model, UserMixin):
 
 class Venue(db.Model):
     __tablename__ = 'venue'
+    __table_args__ = (
+        db.Index('ix_venue_created_at', 'created_at', 'v_no'),
+        db.Index('ix_venue_user', 'user_id'),
+    )
     
     v_no = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, db.ForeignKey('login.sr_no'), nullable=False)
     address = db.Column(db.Text, nullable=False)
     court_name = db.Column(db.String(100), nullable=False)
     rating = db.Column(db.Numeric(2, 1), nullable=True)
+    # Running review aggregates; rating is kept equal to rating_sum / rating_count
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     per_hr_charge = db.Column(db.Numeric(10, 2), nullable=False)
     operating_days = db.Column(db.String(100), nullable=False)
     operating_hours = db.Column(db.String(50), nullable=False)
@@ -74,6 +82,11 @@ class Venue(db.Model):
     bookings = relationship('Booking', backref='venue', lazy='dynamic', cascade='all, delete-orphan')
     reviews = relationship('Review', backref='venue', lazy='dynamic', cascade='all, delete-orphan')
     availability = relationship('VenueAvailability', backref='venue', lazy='dynamic', cascade='all, delete-orphan')
+    sport_tags = relationship('VenueSport', cascade='all, delete-orphan')
+    amenity_tags = relationship('VenueAmenity', cascade='all, delete-orphan')
+    
+    # Relationships read by to_dict, eager loaded by list endpoints
+    serialize_relations = ('owner',)
     
     def to_dict(self):
         return {
@@ -96,11 +109,83 @@ class Venue(db.Model):
             "owner_name": self.owner.fullname if self.owner else None
         }
     
+    @classmethod
+    def columns_query(cls):
+        """to_dict's fields as plain columns, for lists that skip ORM entities"""
+        return (
+            db.session.query(
+                cls.v_no, cls.user_id, cls.address, cls.address.label('location'), cls.court_name,
+                func.nullif(cls.rating, 0, type_=cls.rating.type).label('rating'), cls.per_hr_charge,
+                cls.operating_days, cls.operating_hours, cls.amenities, cls.sports, cls.is_active,
+                cls.total_bookings, func.coalesce(cls.total_revenue, 0).label('total_revenue'),
+                cls.created_at, cls.updated_at, Login.fullname.label('owner_name')
+            )
+            .select_from(cls)
+            .outerjoin(Login, Login.sr_no == cls.user_id)
+        )
+    
+    @validates('sports')
+    def _sync_sport_tags(self, key, value):
+        """Keep venue_sport rows in step with the comma separated sports column"""
+        self.sport_tags = _merge_tags(self.sport_tags, VenueSport, value)
+        return value
+    
+    @validates('amenities')
+    def _sync_amenity_tags(self, key, value):
+        """Keep venue_amenity rows in step with the comma separated amenities column"""
+        self.amenity_tags = _merge_tags(self.amenity_tags, VenueAmenity, value)
+        return value
+    
     def __repr__(self):
         return f'<Venue {self.court_name}>'
 
+def split_tags(value):
+    """Normalize a comma separated list into unique lowercase names"""
+    names = []
+    for part in (value or '').split(','):
+        name = part.strip().lower()[:50]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+def _merge_tags(current, tag_model, value):
+    # Reuse rows for names that stay so unchanged tags are not rewritten
+    existing = {tag.name: tag for tag in current}
+    return [existing.get(name) or tag_model(name=name) for name in split_tags(value)]
+
+class VenueSport(db.Model):
+    """One row per sport offered by a venue, for indexed sport filters"""
+    __tablename__ = 'venue_sport'
+    __table_args__ = (
+        db.Index('ix_venue_sport_name', 'name', 'venue_id'),
+    )
+    
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.v_no', ondelete='CASCADE'), primary_key=True)
+    name = db.Column(db.String(50), primary_key=True)
+
+class VenueAmenity(db.Model):
+    """One row per amenity offered by a venue, for indexed amenity filters"""
+    __tablename__ = 'venue_amenity'
+    __table_args__ = (
+        db.Index('ix_venue_amenity_name', 'name', 'venue_id'),
+    )
+    
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.v_no', ondelete='CASCADE'), primary_key=True)
+    name = db.Column(db.String(50), primary_key=True)
+
+def venues_with_tags(tag_model, value, match_all=False):
+    """Select ids of venues having any (or all) of the comma separated tag names"""
+    names = split_tags(value)
+    query = db.session.query(tag_model.venue_id).filter(tag_model.name.in_(names))
+    if match_all:
+        query = query.group_by(tag_model.venue_id).having(func.count() == len(names))
+    return query
+
 class VenueAvailability(db.Model):
     __tablename__ = 'venue_availability'
+    __table_args__ = (
+        db.Index('ix_venue_availability_venue_date', 'venue_id', 'date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     venue_id = db.Column(db.Integer, db.ForeignKey('venue.v_no'), nullable=False)
@@ -125,6 +210,11 @@ class VenueAvailability(db.Model):
 
 class Booking(db.Model):
     __tablename__ = 'booking'
+    __table_args__ = (
+        db.Index('ix_booking_venue_date_status', 'venue_id', 'st_date', 'status'),
+        db.Index('ix_booking_player_date', 'player_id', 'st_date', 'start_time', 'Bno'),
+        db.Index('ix_booking_venue_date_time', 'venue_id', 'st_date', 'start_time', 'Bno'),
+    )
     
     Bno = db.Column(db.Integer, primary_key=True, autoincrement=True)
     venue_id = db.Column(db.Integer, db.ForeignKey('venue.v_no'), nullable=False)
@@ -145,6 +235,9 @@ class Booking(db.Model):
     # Relationships
     payment = relationship('Payment', backref='booking', uselist=False, cascade='all, delete-orphan')
     
+    # Relationships read by to_dict, eager loaded by list endpoints
+    serialize_relations = ('venue', 'payment')
+    
     def to_dict(self):
         return {
             "Bno": self.Bno,
@@ -167,11 +260,31 @@ class Booking(db.Model):
             "payment_status": self.payment.status if self.payment else None
         }
     
+    @classmethod
+    def columns_query(cls):
+        """to_dict's fields as plain columns, for lists that skip ORM entities"""
+        return (
+            db.session.query(
+                cls.Bno, cls.venue_id, cls.player_id, cls.player_name, cls.email,
+                cls.st_date, cls.start_time, cls.end_time, cls.duration, cls.pay_method, cls.status,
+                func.nullif(cls.total_amount, 0, type_=cls.total_amount.type).label('total_amount'), cls.notes,
+                cls.created_at, cls.updated_at,
+                Venue.court_name.label('venue_name'), Venue.address.label('venue_address'),
+                Payment.status.label('payment_status')
+            )
+            .select_from(cls)
+            .outerjoin(Venue, Venue.v_no == cls.venue_id)
+            .outerjoin(Payment, Payment.booking_id == cls.Bno)
+        )
+    
     def __repr__(self):
         return f'<Booking {self.Bno}>'
 
 class Payment(db.Model):
     __tablename__ = 'payment'
+    __table_args__ = (
+        db.Index('ix_payment_booking', 'booking_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     booking_id = db.Column(db.Integer, db.ForeignKey('booking.Bno'), nullable=False)
@@ -198,6 +311,10 @@ class Payment(db.Model):
 
 class Review(db.Model):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        db.Index('ix_reviews_venue_created', 'venue_id', 'created_at', 'review_id'),
+        db.Index('ix_reviews_booking_user', 'booking_id', 'user_id'),
+    )
     
     review_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     venue_id = db.Column(db.Integer, db.ForeignKey('venue.v_no'), nullable=False)
@@ -208,6 +325,9 @@ class Review(db.Model):
     is_verified = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Relationships read by to_dict, eager loaded by list endpoints
+    serialize_relations = ('user',)
+    
     def to_dict(self):
         return {
             "review_id": self.review_id,
@@ -226,6 +346,11 @@ class Review(db.Model):
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        # Inbox pages, newest first: all notifications, and unread ones only
+        db.Index('ix_notifications_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_notifications_user_read_created', 'user_id', 'is_read', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, db.ForeignKey('login.sr_no'), nullable=False)
@@ -269,6 +394,11 @@ class VenueImage(db.Model):
 class Match(db.Model):
     __bind_key__ = 'matches'
     __tablename__ = 'matches'
+    __table_args__ = (
+        db.Index('ix_matches_date_time', 'date', 'start_time', 'id'),
+        # Sport first: the filtered list is then read in page order from the index
+        db.Index('ix_matches_sport_date_time', 'sport', 'date', 'start_time', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     title = db.Column(db.String(150), nullable=False)
@@ -283,13 +413,11 @@ class Match(db.Model):
     created_by = db.Column(db.Integer, nullable=False)  # references login.sr_no logically
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    def to_dict(self):
-        try:
-            # Lazy import to avoid circulars
-            venue = Venue.query.get(self.venue_id)
-            venue_name = venue.court_name if venue else None
-        except Exception:
-            venue_name = None
+    def to_dict(self, venue_names=None):
+        """Serialize the match; pass venue_names from venue_names_for to batch lookups"""
+        if venue_names is None:
+            venue_names = venue_names_for([self.venue_id])
+        venue_name = venue_names.get(self.venue_id)
 
         return {
             "id": self.id,
@@ -307,66 +435,211 @@ class Match(db.Model):
             "created_at": self.created_at.isoformat() if self.created_at else None
         }
 
+class OutboxEvent(db.Model):
+    """Side effect recorded in the same transaction as the write that caused it"""
+    __tablename__ = 'outbox_event'
+    __table_args__ = (
+        db.Index('ix_outbox_event_pending', 'processed_at', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    topic = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    claimed_by = db.Column(db.String(36), nullable=True)
+    claimed_until = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime, nullable=True)
+
+class DashboardStats(db.Model):
+    """Per-user dashboard counters, maintained incrementally by rollups.py"""
+    __tablename__ = 'dashboard_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('login.sr_no', ondelete='CASCADE'), primary_key=True)
+    # As a facilities owner
+    owned_venues = db.Column(db.Integer, nullable=False, default=0)
+    venue_bookings = db.Column(db.Integer, nullable=False, default=0)
+    venue_revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    # As a player
+    player_bookings = db.Column(db.Integer, nullable=False, default=0)
+    player_completed = db.Column(db.Integer, nullable=False, default=0)
+
+class VenueDailyStats(db.Model):
+    """Bookings and completed revenue per venue per booking date"""
+    __tablename__ = 'venue_daily_stats'
+
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.v_no', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    bookings = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+class VenueRatingDaily(db.Model):
+    """Sum and count of review ratings per venue per review date"""
+    __tablename__ = 'venue_rating_daily'
+
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.v_no', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+
+class NotificationStats(db.Model):
+    """Unread notifications per user, maintained by rollups.py and the notification pipeline"""
+    __tablename__ = 'notification_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('login.sr_no', ondelete='CASCADE'), primary_key=True)
+    unread = db.Column(db.Integer, nullable=False, default=0)
+
+class ResourceVersion(db.Model):
+    """Version counter per cacheable resource, bumped by etags.py on every write"""
+    __tablename__ = 'resource_version'
+
+    name = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+# Venue names are read by every Match.to_dict but live in the primary
+# database, so they are resolved in batches and cached briefly
+venue_name_cache = TTLCache(maxsize=4096, ttl=60)
+
+def venue_names_for(venue_ids):
+    """Map venue ids to court names with at most one IN query for the misses"""
+    venue_ids = set(venue_ids)
+    names = venue_name_cache.get_many(venue_ids)
+    missing = venue_ids - names.keys()
+    if missing:
+        try:
+            rows = db.session.query(Venue.v_no, Venue.court_name).filter(Venue.v_no.in_(missing)).all()
+        except Exception as e:
+            print(f"Error resolving venue names: {e}")
+            rows = []
+        fetched = {row.v_no: row.court_name for row in rows}
+        venue_name_cache.set_many(fetched)
+        names.update(fetched)
+    return names
+
+@event.listens_for(Venue, 'after_update')
+@event.listens_for(Venue, 'after_delete')
+def invalidate_venue_name(mapper, connection, target):
+    """Drop a venue's cached name when it is renamed or deleted"""
+    venue_name_cache.delete(target.v_no)
+
 # Event listeners for automatic updates
 @event.listens_for(Venue, 'after_insert')
 def update_venue_rating(mapper, connection, target):
     """Update venue rating when a new review is added"""
     pass  # This will be implemented in the review creation logic
 
+def apply_rating_delta(connection, venue_id, rating_delta, count_delta):
+    """Adjust a venue's review aggregates in the current transaction"""
+    venue = Venue.__table__
+    new_count = venue.c.rating_count + count_delta
+    new_rating = case(
+        (new_count > 0, func.round((venue.c.rating_sum + rating_delta) * 1.0 / new_count, 1)),
+        else_=None
+    )
+    # rating is assigned first: MySQL evaluates SET left to right, so it
+    # must still see the old sum and count like every other database does
+    connection.execute(
+        update(venue)
+        .where(venue.c.v_no == venue_id)
+        .ordered_values(
+            (venue.c.rating, new_rating),
+            (venue.c.rating_sum, venue.c.rating_sum + rating_delta),
+            (venue.c.rating_count, new_count),
+        )
+    )
+
 @event.listens_for(Review, 'after_insert')
 def update_venue_rating_after_review(mapper, connection, target):
-    """Update venue rating when a new review is added"""
-    try:
-        # Calculate new average rating
-        avg_rating = db.session.query(func.avg(Review.rating)).filter_by(venue_id=target.venue_id).scalar()
-        
-        if avg_rating:
-            venue = Venue.query.get(target.venue_id)
-            if venue:
-                venue.rating = round(float(avg_rating), 1)
-                db.session.commit()
-    except Exception as e:
-        print(f"Error updating venue rating: {e}")
-        db.session.rollback()
+    """Add a new review to its venue's rating aggregates"""
+    apply_rating_delta(connection, target.venue_id, target.rating, 1)
 
-@event.listens_for(Booking, 'after_insert')
-def create_payment_record(mapper, connection, target):
-    """Create payment record when booking is created"""
-    try:
-        payment = Payment(
-            booking_id=target.Bno,
-            user_id=target.player_id,
-            amount=target.total_amount,
-            payment_method=target.pay_method,
-            status='pending'
+@event.listens_for(Review, 'after_update')
+def update_venue_rating_after_review_edit(mapper, connection, target):
+    """Move an edited review's rating between aggregates"""
+    state = inspect(target)
+    rating_history = state.attrs.rating.history
+    venue_history = state.attrs.venue_id.history
+    if not (rating_history.has_changes() or venue_history.has_changes()):
+        return
+    old_rating = rating_history.deleted[0] if rating_history.deleted else target.rating
+    old_venue_id = venue_history.deleted[0] if venue_history.deleted else target.venue_id
+    if old_venue_id == target.venue_id:
+        apply_rating_delta(connection, target.venue_id, target.rating - old_rating, 0)
+    else:
+        apply_rating_delta(connection, old_venue_id, -old_rating, -1)
+        apply_rating_delta(connection, target.venue_id, target.rating, 1)
+
+@event.listens_for(Review, 'after_delete')
+def update_venue_rating_after_review_delete(mapper, connection, target):
+    """Remove a deleted review from its venue's rating aggregates"""
+    apply_rating_delta(connection, target.venue_id, -target.rating, -1)
+
+@event.listens_for(db.session, 'before_flush')
+def create_payment_record(session, flush_context, instances):
+    """Attach a pending payment to each new booking so both are written in one flush"""
+    for obj in list(session.new):
+        if isinstance(obj, Booking) and obj.payment is None:
+            obj.payment = Payment(
+                user_id=obj.player_id,
+                amount=obj.total_amount,
+                payment_method=obj.pay_method,
+                status='pending'
+            )
+
+def apply_stats_delta(connection, venue_id, bookings_delta, revenue_delta):
+    """Adjust a venue's confirmed booking count and revenue in the current transaction"""
+    venue = Venue.__table__
+    connection.execute(
+        update(venue)
+        .where(venue.c.v_no == venue_id)
+        .values(
+            total_bookings=func.coalesce(venue.c.total_bookings, 0) + bookings_delta,
+            total_revenue=func.coalesce(venue.c.total_revenue, 0) + revenue_delta
         )
-        db.session.add(payment)
-        db.session.commit()
-    except Exception as e:
-        print(f"Error creating payment record: {e}")
-        db.session.rollback()
+    )
+
+def _confirmed_contribution(status, amount):
+    """(bookings, revenue) a booking in this state adds to venue stats"""
+    if status == 'confirmed':
+        return 1, amount or 0
+    return 0, 0
+
+@event.listens_for(Booking, 'after_insert')
+def update_venue_stats_after_insert(mapper, connection, target):
+    """Count a booking created directly as confirmed"""
+    bookings, revenue = _confirmed_contribution(target.status, target.total_amount)
+    if bookings:
+        apply_stats_delta(connection, target.venue_id, bookings, revenue)
 
 @event.listens_for(Booking, 'after_update')
 def update_venue_stats(mapper, connection, target):
-    """Update venue statistics when booking status changes"""
-    try:
-        venue = Venue.query.get(target.venue_id)
-        if venue:
-            # Update total bookings
-            confirmed_bookings = Booking.query.filter_by(
-                venue_id=target.venue_id, 
-                status='confirmed'
-            ).count()
-            venue.total_bookings = confirmed_bookings
-            
-            # Update total revenue
-            total_revenue = db.session.query(func.sum(Booking.total_amount)).filter_by(
-                venue_id=target.venue_id, 
-                status='confirmed'
-            ).scalar()
-            venue.total_revenue = total_revenue or 0
-            
-            db.session.commit()
-    except Exception as e:
-        print(f"Error updating venue stats: {e}")
-        db.session.rollback()
+    """Update venue statistics from the booking's status transition"""
+    state = inspect(target)
+    status_history = state.attrs.status.history
+    amount_history = state.attrs.total_amount.history
+    venue_history = state.attrs.venue_id.history
+    if not (status_history.has_changes() or amount_history.has_changes() or venue_history.has_changes()):
+        return
+
+    old_status = status_history.deleted[0] if status_history.deleted else target.status
+    old_amount = amount_history.deleted[0] if amount_history.deleted else target.total_amount
+    old_venue_id = venue_history.deleted[0] if venue_history.deleted else target.venue_id
+
+    old_bookings, old_revenue = _confirmed_contribution(old_status, old_amount)
+    new_bookings, new_revenue = _confirmed_contribution(target.status, target.total_amount)
+    if old_venue_id != target.venue_id:
+        if old_bookings:
+            apply_stats_delta(connection, old_venue_id, -old_bookings, -old_revenue)
+        if new_bookings:
+            apply_stats_delta(connection, target.venue_id, new_bookings, new_revenue)
+    elif (old_bookings, old_revenue) != (new_bookings, new_revenue):
+        apply_stats_delta(connection, target.venue_id, new_bookings - old_bookings, new_revenue - old_revenue)
+
+@event.listens_for(Booking, 'after_delete')
+def update_venue_stats_after_delete(mapper, connection, target):
+    """Remove a deleted confirmed booking from venue statistics"""
+    bookings, revenue = _confirmed_contribution(target.status, target.total_amount)
+    if bookings:
+        apply_stats_delta(connection, target.venue_id, -bookings, -revenue)
@@ -0,0 +1,315 @@
+"""
+Notifications written by the caller's transaction.
+
+send_notification and broadcast_system_message add to the current
+database transaction instead of writing right away. When it commits, the
+pending notifications are stored with one multi-row INSERT per
+NOTIFICATION_BATCH_SIZE rows, as part of that commit, and only then
+emitted to the users' rooms. If the commit fails or is rolled back,
+nothing is stored or pushed, and the caller sees the error: the outbox
+worker leaves its event pending and retries it. A savepoint rolled back
+with begin_nested() discards the notifications added inside it.
+
+An announcement is a single pending item however many users it targets.
+The commit expands it in batches: one INSERT per batch of users, then one
+system_message emit addressed to all of the batch's rooms at once, or a
+single broadcast when it goes to every user.
+"""
+
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import event, insert, select, text, update
+from sqlalchemy.orm import Session
+
+from models import db, Login, Notification, NotificationStats
+from rollups import upsert_add, upsert_add_many
+
+ANNOUNCEMENT_TITLE = 'Announcement'
+_PENDING_KEY = 'pending_notifications'
+_STORED_KEY = 'stored_notifications'
+
+
+class _Metrics:
+    """Pipeline counters and enqueue-to-emit latency"""
+
+    def __init__(self):
+        self.queued = 0
+        self.inserted = 0
+        self.batches = 0
+        self.emits = 0
+        self._latency_total_ms = 0.0
+        self._latency_max_ms = 0.0
+        self._delivered = 0
+        self._lock = threading.Lock()
+
+    def enqueue(self):
+        with self._lock:
+            self.queued += 1
+
+    def record(self, rows=0, emits=0, enqueued_at=()):
+        latencies = [(time.monotonic() - t) * 1000 for t in enqueued_at]
+        with self._lock:
+            self.batches += bool(rows)
+            self.inserted += rows
+            self.emits += emits
+            self._delivered += len(latencies)
+            self._latency_total_ms += sum(latencies)
+            self._latency_max_ms = max([self._latency_max_ms, *latencies])
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "queued": self.queued,
+                "inserted": self.inserted,
+                "batches": self.batches,
+                "emits": self.emits,
+                "latency_ms": {
+                    "avg": round(self._latency_total_ms / self._delivered, 1) if self._delivered else 0.0,
+                    "max": round(self._latency_max_ms, 1),
+                },
+            }
+
+
+def insert_notifications(connection, rows):
+    """
+    One multi-row INSERT of notification rows, plus the unread counters of
+    their users; returns the new ids in order.
+    """
+    table = Notification.__table__
+    if connection.dialect.insert_executemany_returning_sort_by_parameter_order:
+        result = connection.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), rows)
+        ids = list(result.scalars())
+    else:
+        ids = _insert_verified(connection, table, rows)
+
+    # Core inserts skip the mapper events that keep notification_stats current
+    unread = Counter(row['user_id'] for row in rows if not row.get('is_read'))
+    upsert_add_many(connection, NotificationStats.__table__, ['user_id'],
+                    [{'user_id': user_id, 'unread': count} for user_id, count in sorted(unread.items())])
+    return ids
+
+
+def _insert_verified(connection, table, rows):
+    """
+    Multi-row INSERT for MySQL, which has no RETURNING and only reports the
+    first new id. The others are expected auto_increment_increment apart,
+    which Galera, group replication and some innodb_autoinc_lock_mode
+    settings do not promise, so the expected ids are checked against the
+    stored rows. On any mismatch the batch is rolled back to a savepoint
+    and inserted row by row.
+    """
+    savepoint = connection.begin_nested()
+    result = connection.execute(insert(table).values(rows))
+    step = 1
+    if connection.dialect.name == 'mysql':
+        step = connection.execute(text('SELECT @@auto_increment_increment')).scalar()
+    ids = [result.lastrowid + i * step for i in range(len(rows))]
+
+    fields = ('user_id', 'type', 'title', 'message')
+    stored = {row.id: tuple(row[1:]) for row in connection.execute(
+        select(table.c.id, *[table.c[name] for name in fields]).where(table.c.id.in_(ids))
+    )}
+    if all(stored.get(new_id) == tuple(row[name] for name in fields) for new_id, row in zip(ids, rows)):
+        savepoint.commit()
+        return ids
+
+    print(f"Notification ids of a {len(rows)} row INSERT were not consecutive, inserting row by row")
+    savepoint.rollback()
+    return [connection.execute(insert(table).values(row)).inserted_primary_key[0] for row in rows]
+
+
+def mark_read(user_id, ids=None):
+    """
+    Mark the user's notifications read, the given ids or all of them, and
+    update the unread counter in the same transaction. Returns how many
+    changed; the caller commits.
+    """
+    stmt = update(Notification).filter_by(user_id=user_id, is_read=False)
+    if ids is not None:
+        stmt = stmt.where(Notification.id.in_(ids))
+    connection = db.session.connection()
+    changed = connection.execute(stmt.values(is_read=True)).rowcount
+    if changed:
+        upsert_add(connection, NotificationStats.__table__, {'user_id': user_id}, {'unread': -changed})
+    return changed
+
+
+def unread_count(user_id):
+    """Unread notifications of a user, from their counter row"""
+    return db.session.query(NotificationStats.unread).filter_by(user_id=user_id).scalar() or 0
+
+
+def _payload(notification_id, row):
+    return {
+        "id": notification_id,
+        "user_id": row['user_id'],
+        "title": row['title'],
+        "message": row['message'],
+        "type": row['type'],
+        "is_read": False,
+        "data": json.loads(row['data']) if row['data'] else None,
+        "created_at": row['created_at'].isoformat(),
+    }
+
+
+def _within(transaction, savepoint):
+    """Whether transaction is savepoint or one nested inside it"""
+    while transaction is not None:
+        if transaction is savepoint:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+class NotificationQueue:
+    """Notifications pending in the current transaction, stored by its commit"""
+
+    def __init__(self):
+        self.batch_size = 1000
+        self.metrics = _Metrics()
+        self._socketio = None
+
+    def init_app(self, app, socketio):
+        self._socketio = socketio
+        self.batch_size = app.config.get('NOTIFICATION_BATCH_SIZE', self.batch_size)
+
+    def _add(self, item):
+        session = db.session()
+        pending = session.info.setdefault(_PENDING_KEY, [])
+        pending.append((session.get_nested_transaction(), time.monotonic(), item))
+        self.metrics.enqueue()
+
+    def notify(self, user_id, title, message, notification_type, data=None):
+        """Add a notification for one user to the current transaction; the caller commits"""
+        self._add(('notify', {
+            'user_id': user_id,
+            'title': title,
+            'message': message,
+            'type': notification_type,
+            'data': json.dumps(data) if data else None,
+        }))
+
+    def announce(self, message, user_ids=None):
+        """Add a system message for the given users, or for every user; the caller commits"""
+        self._add(('announce', message, list(user_ids) if user_ids else None))
+
+    def store(self, session):
+        """Insert the session's pending notifications; the emits wait for the commit"""
+        pending = session.info.pop(_PENDING_KEY, None)
+        if not pending:
+            return
+        # Rows they refer to may still be waiting for the commit's own flush
+        session.flush()
+        connection = session.connection(bind_arguments={'mapper': Notification.__mapper__})
+        stored = session.info.setdefault(_STORED_KEY, [])
+        notifications = []
+        for _, enqueued, item in pending:
+            if item[0] == 'notify':
+                notifications.append((enqueued, item[1]))
+                if len(notifications) >= self.batch_size:
+                    stored.append(self._store_batch(connection, notifications))
+                    notifications = []
+            else:
+                stored.append(self._store_announcement(connection, enqueued, *item[1:]))
+        if notifications:
+            stored.append(self._store_batch(connection, notifications))
+
+    def emit(self, session):
+        """Push what the committed transaction stored"""
+        for send in session.info.pop(_STORED_KEY, []):
+            send()
+
+    def discard(self, session, savepoint=None):
+        """Forget notifications of a rolled back transaction or savepoint"""
+        if savepoint is None:
+            session.info.pop(_PENDING_KEY, None)
+            session.info.pop(_STORED_KEY, None)
+            return
+        pending = session.info.get(_PENDING_KEY)
+        if pending:
+            pending[:] = [entry for entry in pending if not _within(entry[0], savepoint)]
+
+    def _store_batch(self, connection, notifications):
+        rows = [row for _, row in notifications]
+        ids = _insert(connection, rows)
+
+        def send():
+            for notification_id, row in zip(ids, rows):
+                self._socketio.emit('new_notification', _payload(notification_id, row), room=f"user_{row['user_id']}")
+            self.metrics.record(len(rows), len(rows), [enqueued for enqueued, _ in notifications])
+        return send
+
+    def _store_announcement(self, connection, enqueued, message, user_ids):
+        if user_ids is None:
+            batches = self._all_user_batches(connection)
+        else:
+            batches = (user_ids[i:i + self.batch_size] for i in range(0, len(user_ids), self.batch_size))
+
+        stored = []
+        for batch in batches:
+            _insert(connection, [{'user_id': user_id, 'title': ANNOUNCEMENT_TITLE, 'message': message,
+                                  'type': 'system', 'data': None} for user_id in batch])
+            stored.append(batch)
+
+        def send():
+            payload = {'message': message, 'timestamp': datetime.utcnow().isoformat()}
+            for batch in stored:
+                if user_ids is not None:
+                    # One emit for the whole batch, addressed to every user's room
+                    self._socketio.emit('system_message', payload, to=[f"user_{user_id}" for user_id in batch])
+                self.metrics.record(len(batch), int(user_ids is not None))
+            if user_ids is None:
+                self._socketio.emit('system_message', payload)
+            self.metrics.record(emits=int(user_ids is None), enqueued_at=[enqueued])
+        return send
+
+    def _all_user_batches(self, connection):
+        last_id = 0
+        while True:
+            batch = list(connection.execute(
+                select(Login.sr_no).where(Login.sr_no > last_id).order_by(Login.sr_no).limit(self.batch_size)
+            ).scalars())
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1]
+
+
+def _insert(connection, rows):
+    now = datetime.utcnow()
+    for row in rows:
+        row.update(is_read=False, created_at=now)
+    return insert_notifications(connection, rows)
+
+
+notification_queue = NotificationQueue()
+
+
+@event.listens_for(Session, 'before_commit')
+def _store_notifications(session):
+    # Savepoint releases fire this too; only the outermost commit stores
+    if session.get_nested_transaction() is None:
+        notification_queue.store(session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _emit_notifications(session):
+    if session.get_nested_transaction() is None:
+        notification_queue.emit(session)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_savepoint(session, previous_transaction):
+    if previous_transaction.nested:
+        notification_queue.discard(session, previous_transaction)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_notifications(session, transaction):
+    # Runs after after_commit, so this only drops what was rolled back or closed
+    if transaction.parent is None:
+        notification_queue.discard(session)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Transactional outbox for side effects of writes.
+
+Request handlers call enqueue() before committing; the event row is
+inserted by the same commit as the booking or review it describes, so
+either both exist or neither does. A background worker drains pending
+events in batches and runs the handler registered for each topic
+(notifications, socket broadcasts), keeping that work off the request.
+
+With OUTBOX_WORKER on (the default), every app process runs a worker
+thread, started by its first request or outbox commit, whatever serves
+it (python app.py, gunicorn, any WSGI host). `python outbox.py` runs a
+standalone worker, e.g. for deployments that turn the threads off.
+
+Workers claim a batch by stamping it with their id and a lease, so
+several processes can drain the same table without running an event
+twice. A batch is committed once; an event whose handler fails is rolled
+back to its savepoint and retried after the lease expires, up to
+OUTBOX_MAX_ATTEMPTS times.
+"""
+
+import json
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event, or_, update
+from sqlalchemy.orm import Session
+
+from models import db, OutboxEvent, Booking, Review, Venue
+from socket_manager import on_booking_created, on_booking_status_changed, on_review_created, on_venue_updated
+
+_handlers = {}
+_wakeup = threading.Event()
+_PENDING_KEY = 'outbox_pending'
+
+_app = None
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def handler(topic):
+    """Register the function that processes events of a topic"""
+    def register(func):
+        _handlers[topic] = func
+        return func
+    return register
+
+
+def enqueue(topic, payload):
+    """Add an event to the current transaction; it is only visible once committed"""
+    db.session.add(OutboxEvent(topic=topic, payload=json.dumps(payload)))
+    db.session.info[_PENDING_KEY] = True
+
+
+def init_app(app):
+    """Run a worker thread in this process unless OUTBOX_WORKER is off"""
+    global _app
+    _app = app if app.config.get('OUTBOX_WORKER', True) else None
+    if _app is not None:
+        # The first request starts the worker, which drains events left by earlier processes
+        app.before_request(_ensure_worker)
+
+
+def _ensure_worker():
+    global _worker
+    if _app is None or _worker is not None:
+        return
+    with _worker_lock:
+        if _worker is None:
+            # Started on first use so importing the app never starts threads
+            _worker = threading.Thread(target=run_worker, args=(_app,), name='outbox-worker', daemon=True)
+            _worker.start()
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_worker(session):
+    # Start draining right away instead of waiting for the next poll, once
+    # the events are visible: releasing a savepoint fires this too
+    if session.get_nested_transaction() is None and session.info.pop(_PENDING_KEY, False):
+        _ensure_worker()
+        _wakeup.set()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_pending(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop(_PENDING_KEY, None)
+
+
+def _claim_batch(worker_id, batch_size, lease_seconds, max_attempts):
+    now = datetime.utcnow()
+    claimable = (
+        OutboxEvent.processed_at.is_(None),
+        OutboxEvent.attempts < max_attempts,
+        or_(OutboxEvent.claimed_until.is_(None), OutboxEvent.claimed_until < now),
+    )
+    ids = [row.id for row in db.session.query(OutboxEvent.id)
+           .filter(*claimable).order_by(OutboxEvent.id).limit(batch_size)]
+    if not ids:
+        return []
+    # Conditional update: a concurrent worker that claimed first wins
+    db.session.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.id.in_(ids), *claimable)
+        .values(claimed_by=worker_id, claimed_until=now + timedelta(seconds=lease_seconds),
+                attempts=OutboxEvent.attempts + 1)
+    )
+    db.session.commit()
+    return (OutboxEvent.query.filter_by(claimed_by=worker_id)
+            .filter(OutboxEvent.id.in_(ids)).order_by(OutboxEvent.id).all())
+
+
+def drain(batch_size=100, lease_seconds=60, max_attempts=5):
+    """Process one batch of pending events in one commit; returns how many were handled"""
+    worker_id = str(uuid.uuid4())
+    events = _claim_batch(worker_id, batch_size, lease_seconds, max_attempts)
+    for outbox_event in events:
+        try:
+            # A failing handler only undoes its own writes
+            with db.session.begin_nested():
+                func = _handlers.get(outbox_event.topic)
+                if func is None:
+                    raise LookupError(f"No handler for topic {outbox_event.topic}")
+                func(json.loads(outbox_event.payload))
+            outbox_event.processed_at = datetime.utcnow()
+            outbox_event.last_error = None
+        except Exception as e:
+            outbox_event.last_error = str(e)
+            current_app.logger.warning(f"Outbox event {outbox_event.id} ({outbox_event.topic}) failed on attempt {outbox_event.attempts}: {e}")
+    db.session.commit()
+    return len(events)
+
+
+def run_worker(app, stop_event=None):
+    """Drain the outbox until stop_event is set, sleeping while it is empty"""
+    stop_event = stop_event or threading.Event()
+    batch_size = app.config.get('OUTBOX_BATCH_SIZE', 100)
+    lease_seconds = app.config.get('OUTBOX_LEASE_SECONDS', 60)
+    max_attempts = app.config.get('OUTBOX_MAX_ATTEMPTS', 5)
+    poll_interval = app.config.get('OUTBOX_POLL_INTERVAL', 1.0)
+
+    while not stop_event.is_set():
+        handled = 0
+        with app.app_context():
+            try:
+                handled = drain(batch_size, lease_seconds, max_attempts)
+            except Exception as e:
+                db.session.rollback()
+                app.logger.exception(f"Outbox worker error: {e}")
+            finally:
+                db.session.remove()
+        if handled < batch_size:
+            _wakeup.wait(poll_interval)
+            _wakeup.clear()
+
+
+@handler('booking_created')
+def _booking_created(payload):
+    booking = db.session.get(Booking, payload['booking_id'])
+    if booking:
+        on_booking_created(booking)
+
+
+@handler('booking_status_changed')
+def _booking_status_changed(payload):
+    booking = db.session.get(Booking, payload['booking_id'])
+    if booking:
+        on_booking_status_changed(booking, payload['old_status'])
+
+
+@handler('review_created')
+def _review_created(payload):
+    review = db.session.get(Review, payload['review_id'])
+    if review:
+        on_review_created(review)
+
+
+@handler('venue_updated')
+def _venue_updated(payload):
+    venue = db.session.get(Venue, payload['venue_id'])
+    if venue:
+        on_venue_updated(venue)
+
+
+if __name__ == '__main__':
+    from app import create_app
+    print("🚀 Outbox worker running, press Ctrl+C to stop")
+    try:
+        run_worker(create_app({'OUTBOX_WORKER': False}))
+    except KeyboardInterrupt:
+        print("\n👋 Outbox worker stopped")
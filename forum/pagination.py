@@ -0,0 +1,142 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+A page is ordered by a fixed tuple of columns ending in the primary key,
+e.g. (created_at, v_no). The cursor is the key of the last row served,
+encoded as URL-safe base64 JSON, and the next page starts strictly after
+it. Unlike OFFSET, deep pages cost the same as the first one as long as
+an index matches the ordering.
+
+Bodies stay plain JSON arrays so existing clients keep working; the cursor
+for the following page is sent in the X-Next-Cursor header (absent on the
+last page) together with a Link rel="next" header.
+
+When rows are filtered after fetching, a page is refilled from the rows
+that follow, at most PAGE_MAX_BATCHES fetches per request. A page cut
+short that way may hold fewer rows than the limit, or none, and still
+carries a cursor, which points past the last row examined.
+"""
+
+import base64
+import json
+from datetime import datetime, date, time
+from urllib.parse import urlencode
+
+from flask import current_app, request
+from sqlalchemy import and_, or_
+
+from serialization import json_response
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+PAGE_LIMIT_HEADER = 'X-Page-Limit'
+
+
+class InvalidCursor(ValueError):
+    """Raised for malformed cursor or limit arguments"""
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+
+def _decode_value(column, value):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type in (datetime, date, time):
+        return python_type.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(values):
+    raw = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor does not match the page ordering")
+        return [_decode_value(col, v) for col, v in zip(columns, values)]
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def parse_limit(value):
+    default = current_app.config.get('PAGE_SIZE_DEFAULT', 100)
+    maximum = current_app.config.get('PAGE_SIZE_MAX', 500)
+    if value in (None, ''):
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise InvalidCursor("limit must be an integer")
+    if limit < 1:
+        raise InvalidCursor("limit must be positive")
+    return min(limit, maximum)
+
+
+def _after(order, values):
+    """Rows sorting strictly after `values` in the given ordering"""
+    clauses = []
+    for i, (column, descending) in enumerate(order):
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*[order[j][0] == values[j] for j in range(i)], step))
+    return or_(*clauses)
+
+
+def paginate(query, order, args=None, row_key=None, keep=None):
+    """
+    Fetch one page of an ORM query.
+
+    `order` is a sequence of (column attribute, descending) pairs that must
+    end with the primary key. `row_key` extracts those values from a result
+    row when it is not a single entity. `keep` optionally filters each
+    fetched batch, for conditions SQL cannot express: it receives the rows
+    and returns those to serve, and the page is refilled from the following
+    rows. Returns (rows, limit, next_cursor).
+    """
+    args = request.args if args is None else args
+    columns = [column for column, _ in order]
+    limit = parse_limit(args.get('limit'))
+    key = row_key or (lambda row: [getattr(row, c.key) for c in columns])
+
+    cursor = args.get('cursor')
+    after = decode_cursor(cursor, columns) if cursor else None
+
+    query = query.order_by(*[c.desc() if descending else c.asc() for c, descending in order])
+    max_batches = current_app.config.get('PAGE_MAX_BATCHES', 5)
+    rows = []
+    for _ in range(max_batches):
+        batch = (query.filter(_after(order, after)) if after is not None else query).limit(limit + 1).all()
+        rows.extend(batch if keep is None else keep(batch))
+        if len(rows) > limit or len(batch) <= limit:
+            break
+        after = key(batch[-1])
+    else:
+        # Scanned enough for one request: serve what was found, the next
+        # page goes on after the last row examined
+        return rows, limit, encode_cursor(after)
+
+    next_cursor = None
+    if len(rows) > limit:
+        # The next page starts after the last row served, skipped rows after it fail `keep` anyway
+        rows = rows[:limit]
+        next_cursor = encode_cursor(key(rows[-1]))
+    return rows, limit, next_cursor
+
+
+def page_response(items, limit, next_cursor):
+    """JSON array response carrying the pagination headers"""
+    response = json_response(items)
+    response.headers[PAGE_LIMIT_HEADER] = str(limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        args = request.args.to_dict()
+        args.update(cursor=next_cursor, limit=limit)
+        response.headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return response
@@ -0,0 +1,151 @@
+"""
+Password hashing off the request threads.
+
+bcrypt is deliberately slow (hundreds of milliseconds at the default cost),
+so a burst of logins would otherwise tie up every worker thread. Hashes are
+computed on a dedicated process pool of PASSWORD_HASH_WORKERS processes.
+At most PASSWORD_HASH_QUEUE calls may be in flight; further calls are
+rejected with HashingBusy straight away, which routes turn into
+503 Service Unavailable with a Retry-After header.
+
+The cost factor is BCRYPT_LOG_ROUNDS (the Flask-Bcrypt setting). When it
+changes, verify_password returns a fresh hash at the new cost for the
+caller to store, so existing users are migrated on their next login.
+
+Set PASSWORD_HASH_WORKERS to 0 to hash inline, e.g. in tests.
+"""
+
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+import bcrypt
+from flask import jsonify
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool is saturated"""
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(password, password_hash):
+    return bcrypt.checkpw(password, password_hash)
+
+
+def hash_rounds(password_hash):
+    """Cost factor encoded in a bcrypt hash ($2b$<rounds>$...)"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class _Metrics:
+    """Call counts and latency per operation, including time spent queued"""
+
+    def __init__(self):
+        self._stats = {}
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def record(self, operation, elapsed_ms):
+        with self._lock:
+            stats = self._stats.setdefault(operation, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats["calls"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self):
+        with self._lock:
+            operations = {
+                name: {
+                    "calls": s["calls"],
+                    "avg_ms": round(s["total_ms"] / s["calls"], 1),
+                    "max_ms": round(s["max_ms"], 1),
+                }
+                for name, s in self._stats.items()
+            }
+            return {"operations": operations, "rejected": self.rejected}
+
+
+class PasswordHasher:
+    """Runs bcrypt calls on a bounded process pool"""
+
+    def __init__(self):
+        self.rounds = 12
+        self.workers = 2
+        self.timeout = 10
+        self.retry_after = 1
+        self.metrics = _Metrics()
+        self._slots = threading.BoundedSemaphore(8)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', self.rounds)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', self.workers)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', self.timeout)
+        self.retry_after = app.config.get('PASSWORD_HASH_RETRY_AFTER', self.retry_after)
+        self._slots = threading.BoundedSemaphore(app.config.get('PASSWORD_HASH_QUEUE', 8))
+
+    def _executor(self):
+        # Created on first use so importing the app never forks
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _run(self, operation, func, *args):
+        if not self._slots.acquire(blocking=False):
+            self.metrics.reject()
+            raise HashingBusy(f"Too many concurrent {operation} calls")
+        started = time.perf_counter()
+        try:
+            if not self.workers:
+                return func(*args)
+            try:
+                return self._executor().submit(func, *args).result(timeout=self.timeout)
+            except FutureTimeout:
+                raise HashingBusy(f"{operation} timed out")
+        finally:
+            self._slots.release()
+            self.metrics.record(operation, (time.perf_counter() - started) * 1000)
+
+    def hash_password(self, password):
+        """bcrypt hash of password at the configured cost"""
+        return self._run('hash', _hash, password.encode('utf-8'), self.rounds)
+
+    def verify_password(self, password_hash, password):
+        """
+        Return (matches, new_hash). new_hash is set when the password
+        matches but was hashed at a different cost and should be replaced.
+        """
+        if not self._run('check', _check, password.encode('utf-8'), password_hash.encode('utf-8')):
+            return False, None
+        if hash_rounds(password_hash) != self.rounds:
+            return True, self.hash_password(password)
+        return True, None
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+password_hasher = PasswordHasher()
+
+
+def busy_response(error):
+    """503 telling the client when to retry"""
+    response = jsonify({"error": f"Server busy, please retry: {error}"})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(password_hasher.retry_after)
+    return response
@@ -0,0 +1,205 @@
+"""
+Presence of connected users.
+
+Each Socket.IO connection (sid) of an authenticated user is registered
+with an expiry time. Both backends keep a reverse index from user to sids,
+so checking whether a user is online is a single lookup, and a user stays
+online while any of their tabs is connected.
+
+Every process refreshes the sids connected to it every
+PRESENCE_HEARTBEAT_INTERVAL seconds, pushing their expiry PRESENCE_TTL
+seconds ahead. Sids of a process that dies without running the disconnect
+handlers stop being refreshed and expire on their own; in Redis the
+per-user keys carry the same expiry, so they are deleted too.
+
+Two backends are available, selected by PRESENCE_BACKEND: "memory" (per
+process) and "redis" (shared between processes, uses REDIS_URL).
+"""
+
+import math
+import threading
+import time
+
+
+class MemoryBackend:
+    """Per process backend: sid expiries grouped by user"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._users = {}
+        self._lock = threading.Lock()
+
+    def add(self, sid, user_id, expires):
+        with self._lock:
+            self._users.setdefault(user_id, {})[sid] = expires
+
+    def remove(self, sid, user_id, now):
+        with self._lock:
+            sids = self._users.get(user_id, {})
+            sids.pop(sid, None)
+            if not sids:
+                self._users.pop(user_id, None)
+
+    def refresh(self, connections, expires, now):
+        with self._lock:
+            for sid, user_id in connections:
+                self._users.setdefault(user_id, {})[sid] = expires
+            for user_id in list(self._users):
+                sids = self._users[user_id]
+                for sid in [sid for sid, until in sids.items() if until <= now]:
+                    del sids[sid]
+                if not sids:
+                    del self._users[user_id]
+
+    def is_online(self, user_id, now):
+        with self._lock:
+            return any(until > now for until in self._users.get(user_id, {}).values())
+
+    def online_users(self, now):
+        with self._lock:
+            return [user_id for user_id, sids in self._users.items()
+                    if any(until > now for until in sids.values())]
+
+    def sids(self, user_id, now):
+        with self._lock:
+            return [sid for sid, until in self._users.get(user_id, {}).items() if until > now]
+
+
+# Drop a sid and expired ones of the same user, then move the user's expiry
+# in the online set to their latest remaining sid, or remove the user
+_REMOVE_SID = """
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[3])
+local latest = redis.call('ZREVRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+if #latest == 0 then
+    redis.call('ZREM', KEYS[2], ARGV[2])
+else
+    redis.call('ZADD', KEYS[2], latest[2], ARGV[2])
+end
+"""
+
+
+class RedisBackend:
+    """
+    Backend shared by all processes through Redis.
+
+    Per user, a sorted set of sids scored by expiry; one sorted set of
+    online users scored by the expiry of their latest sid.
+    """
+
+    name = 'redis'
+
+    def __init__(self, url, prefix='presence:'):
+        import redis
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.client.ping()
+        self.prefix = prefix
+        self.online_key = f'{prefix}online'
+        self._remove_sid = self.client.register_script(_REMOVE_SID)
+
+    def _user_key(self, user_id):
+        return f'{self.prefix}user:{user_id}'
+
+    def add(self, sid, user_id, expires):
+        pipe = self.client.pipeline(transaction=False)
+        self._touch(pipe, sid, user_id, expires)
+        pipe.execute()
+
+    def _touch(self, pipe, sid, user_id, expires):
+        user_key = self._user_key(user_id)
+        pipe.zadd(user_key, {sid: expires})
+        # Keys of users whose processes died without disconnecting them go away on their own
+        pipe.expireat(user_key, math.ceil(expires))
+        pipe.zadd(self.online_key, {user_id: expires}, gt=True)
+
+    def remove(self, sid, user_id, now):
+        self._remove_sid(keys=[self._user_key(user_id), self.online_key], args=[sid, user_id, now])
+
+    def refresh(self, connections, expires, now):
+        pipe = self.client.pipeline(transaction=False)
+        for sid, user_id in connections:
+            # Also drops sids of other processes that stopped refreshing them
+            pipe.zremrangebyscore(self._user_key(user_id), '-inf', now)
+            self._touch(pipe, sid, user_id, expires)
+        pipe.zremrangebyscore(self.online_key, '-inf', now)
+        pipe.execute()
+
+    def is_online(self, user_id, now):
+        until = self.client.zscore(self.online_key, user_id)
+        return until is not None and until > now
+
+    def online_users(self, now):
+        return [int(user_id) for user_id in self.client.zrangebyscore(self.online_key, f'({now}', '+inf')]
+
+    def sids(self, user_id, now):
+        return self.client.zrangebyscore(self._user_key(user_id), f'({now}', '+inf')
+
+
+class PresenceRegistry:
+    """Online users, with heartbeats for the sids connected to this process"""
+
+    def __init__(self):
+        self.ttl = 60
+        self.heartbeat_interval = 20
+        self.backend = MemoryBackend()
+        self._local = {}
+        self._lock = threading.Lock()
+        self._heartbeat = None
+
+    def init_app(self, app):
+        self.ttl = app.config.get('PRESENCE_TTL', self.ttl)
+        self.heartbeat_interval = app.config.get('PRESENCE_HEARTBEAT_INTERVAL', self.heartbeat_interval)
+        self.backend = MemoryBackend()
+        if app.config.get('PRESENCE_BACKEND', 'memory') == 'redis':
+            try:
+                self.backend = RedisBackend(app.config.get('REDIS_URL', 'redis://localhost:6379/0'))
+            except Exception as e:
+                print(f"Warning: Redis presence unavailable, using memory: {e}")
+        with self._lock:
+            self._local.clear()
+
+    def connect(self, sid, user_id):
+        with self._lock:
+            self._local[sid] = user_id
+            if self._heartbeat is None:
+                # Started on the first connection so importing the app never starts threads
+                self._heartbeat = threading.Thread(target=self._run_heartbeats, name='presence-heartbeat', daemon=True)
+                self._heartbeat.start()
+        self.backend.add(sid, user_id, time.time() + self.ttl)
+
+    def disconnect(self, sid):
+        """Unregister sid; returns its user id, or None for anonymous connections"""
+        with self._lock:
+            user_id = self._local.pop(sid, None)
+        if user_id is not None:
+            self.backend.remove(sid, user_id, time.time())
+        return user_id
+
+    def heartbeat(self):
+        """Push the expiry of every sid connected to this process forward"""
+        with self._lock:
+            connections = list(self._local.items())
+        now = time.time()
+        self.backend.refresh(connections, now + self.ttl, now)
+
+    def _run_heartbeats(self):
+        while True:
+            time.sleep(self.heartbeat_interval)
+            try:
+                self.heartbeat()
+            except Exception as e:
+                print(f"Presence heartbeat error: {e}")
+
+    def is_online(self, user_id):
+        return self.backend.is_online(user_id, time.time())
+
+    def online_users(self):
+        return self.backend.online_users(time.time())
+
+    def sids(self, user_id):
+        """Live sids of a user across all processes sharing the backend"""
+        return self.backend.sids(user_id, time.time())
+
+
+presence = PresenceRegistry()
@@ -0,0 +1,77 @@
+"""
+Per-request SQL statement counting.
+
+Every statement executed while handling a request increments a counter on
+flask.g; the total is returned in the X-Query-Count response header so
+query regressions (such as reintroduced N+1 loads) are visible from the
+outside and can be tracked by benchmarks/query_counts.py.
+
+When QUERY_LOG_PATH is set, every statement is also appended to that file
+as a JSON line (dialect, statement, parameters, endpoint). The recorded
+workload can be replayed by benchmarks/explain_plans.py to check the
+query plans.
+"""
+
+import json
+import threading
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+QUERY_COUNT_HEADER = 'X-Query-Count'
+
+_log = None
+_log_lock = threading.Lock()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+    if _log is not None:
+        _record(conn, statement, parameters[0] if executemany and parameters else parameters)
+
+
+def _record(conn, statement, parameters):
+    entry = json.dumps({
+        "dialect": conn.dialect.name,
+        "statement": statement,
+        "parameters": parameters,
+        "endpoint": request.endpoint if has_request_context() else None,
+    }, default=str)
+    with _log_lock:
+        _log.write(entry + '\n')
+        _log.flush()
+
+
+def start_recording(path):
+    """Append every statement executed from now on to path"""
+    global _log
+    with _log_lock:
+        if _log is not None:
+            _log.close()
+        _log = open(path, 'a', encoding='utf-8')
+
+
+def stop_recording():
+    global _log
+    with _log_lock:
+        if _log is not None:
+            _log.close()
+            _log = None
+
+
+def get_query_count():
+    """Statements executed so far in the current request"""
+    return g.get('query_count', 0) if has_request_context() else 0
+
+
+def init_app(app):
+    if app.config.get('QUERY_LOG_PATH'):
+        start_recording(app.config['QUERY_LOG_PATH'])
+
+    @app.after_request
+    def add_query_count_header(response):
+        response.headers[QUERY_COUNT_HEADER] = str(get_query_count())
+        return response
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Rebuild denormalized aggregates from the source rows.
+
+The aggregates are maintained incrementally as rows are written; this
+script recomputes them in bulk, set-based statements to repair any drift
+(manual SQL edits, bulk imports that bypass the ORM, crashes). It is safe
+to run at any time, e.g. nightly from cron.
+"""
+
+from sqlalchemy import case, delete, func, insert, literal, select, union_all, update
+from app import create_app
+from models import (db, Venue, Booking, Review, Notification, DashboardStats, VenueDailyStats, VenueRatingDaily,
+                    NotificationStats)
+
+
+def reconcile_ratings():
+    """Venue rating_sum, rating_count and rating recomputed from reviews"""
+    review_sum = (select(func.coalesce(func.sum(Review.rating), 0))
+                  .where(Review.venue_id == Venue.v_no).scalar_subquery())
+    review_count = (select(func.count(Review.review_id))
+                    .where(Review.venue_id == Venue.v_no).scalar_subquery())
+    result = db.session.execute(
+        update(Venue.__table__).values(
+            rating_sum=review_sum,
+            rating_count=review_count,
+            rating=case((review_count > 0, func.round(review_sum * 1.0 / review_count, 1)), else_=None)
+        )
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def reconcile_venue_stats():
+    """Venue total_bookings and total_revenue recomputed from confirmed bookings"""
+    confirmed = (Booking.venue_id == Venue.v_no) & (Booking.status == 'confirmed')
+    result = db.session.execute(
+        update(Venue.__table__).values(
+            total_bookings=select(func.count(Booking.Bno)).where(confirmed).scalar_subquery(),
+            total_revenue=select(func.coalesce(func.sum(Booking.total_amount), 0)).where(confirmed).scalar_subquery()
+        )
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def reconcile_dashboard_rollups():
+    """dashboard_stats and venue_daily_stats rebuilt from bookings and venues"""
+    completed = case((Booking.status == 'completed', 1), else_=0)
+    completed_revenue = case((Booking.status == 'completed', Booking.total_amount), else_=0)
+
+    db.session.execute(delete(VenueDailyStats))
+    db.session.execute(insert(VenueDailyStats).from_select(
+        ['venue_id', 'day', 'bookings', 'completed', 'revenue'],
+        select(Booking.venue_id, Booking.st_date, func.count(), func.sum(completed), func.sum(completed_revenue))
+        .group_by(Booking.venue_id, Booking.st_date)
+    ))
+
+    # One row per (user, metric source), summed per user below
+    zero = literal(0)
+    per_source = union_all(
+        select(Venue.user_id.label('user_id'), func.count().label('owned_venues'), zero.label('venue_bookings'),
+               zero.label('venue_revenue'), zero.label('player_bookings'), zero.label('player_completed'))
+        .group_by(Venue.user_id),
+        select(Venue.user_id, zero, func.count(), func.sum(completed_revenue), zero, zero)
+        .join(Booking, Booking.venue_id == Venue.v_no).group_by(Venue.user_id),
+        select(Booking.player_id, zero, zero, zero, func.count(), func.sum(completed))
+        .group_by(Booking.player_id),
+    ).subquery()
+    db.session.execute(delete(DashboardStats))
+    db.session.execute(insert(DashboardStats).from_select(
+        ['user_id', 'owned_venues', 'venue_bookings', 'venue_revenue', 'player_bookings', 'player_completed'],
+        select(per_source.c.user_id, func.sum(per_source.c.owned_venues), func.sum(per_source.c.venue_bookings),
+               func.sum(per_source.c.venue_revenue), func.sum(per_source.c.player_bookings),
+               func.sum(per_source.c.player_completed))
+        .group_by(per_source.c.user_id)
+    ))
+    db.session.commit()
+    return db.session.query(DashboardStats).count()
+
+
+def reconcile_rating_daily():
+    """venue_rating_daily rebuilt from reviews"""
+    db.session.execute(delete(VenueRatingDaily))
+    day = func.date(Review.created_at)
+    db.session.execute(insert(VenueRatingDaily).from_select(
+        ['venue_id', 'day', 'rating_sum', 'rating_count'],
+        select(Review.venue_id, day, func.sum(Review.rating), func.count())
+        .where(Review.created_at.isnot(None))
+        .group_by(Review.venue_id, day)
+    ))
+    db.session.commit()
+    return db.session.query(VenueRatingDaily).count()
+
+
+def reconcile_notification_stats():
+    """notification_stats unread counters recomputed from notifications"""
+    db.session.execute(delete(NotificationStats))
+    db.session.execute(insert(NotificationStats).from_select(
+        ['user_id', 'unread'],
+        select(Notification.user_id, func.count())
+        .where(Notification.is_read.isnot(True))
+        .group_by(Notification.user_id)
+    ))
+    db.session.commit()
+    return db.session.query(NotificationStats).count()
+
+
+RECONCILERS = [
+    reconcile_ratings,
+    reconcile_venue_stats,
+    reconcile_dashboard_rollups,
+    reconcile_rating_daily,
+    reconcile_notification_stats,
+]
+
+
+def reconcile():
+    app = create_app()
+
+    with app.app_context():
+        for step in RECONCILERS:
+            rows = step()
+            print(f"✅ {step.__doc__} ({rows} rows)")
+
+
+if __name__ == '__main__':
+    reconcile()
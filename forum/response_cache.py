@@ -0,0 +1,236 @@
+"""
+Read-through cache for public GET responses.
+
+Views decorated with @cached(tags) are looked up by their path and
+normalized query string (sorted, empty values dropped). Only 200 responses
+are stored, together with the headers the view set (content type and
+pagination headers).
+
+Invalidation is by tag: every tag has a version number that is part of the
+cache key, and invalidate() bumps the versions of the given tags, so all
+responses carrying one of them are missed from then on and age out through
+the TTL. Write routes call invalidate() after committing. Behind @etag
+(etags.py) the key also includes the ETag computed from the database's
+resource versions, so processes that missed an invalidate() never serve a
+body older than the ETag it is sent with.
+
+Two backends are available, selected by RESPONSE_CACHE_BACKEND:
+"memory" (per process LRU with TTL) and "redis" (shared between processes,
+uses REDIS_URL). "none" disables caching.
+"""
+
+import hashlib
+import json
+import threading
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, g, jsonify, request
+
+from caching import TTLCache
+
+CACHE_HEADER = 'X-Cache'
+_SKIPPED_HEADERS = {'content-length', 'set-cookie'}
+
+# Tags shared by many responses
+VENUES = 'venues'
+MATCHES = 'matches'
+USERS = 'users'
+AVAILABILITY = 'availability'
+VENUE_NAMES = 'venue-names'
+
+
+def venue_tag(venue_id):
+    return f'venue:{venue_id}'
+
+
+def reviews_tag(venue_id):
+    return f'reviews:{venue_id}'
+
+
+def bookings_tag(user_id):
+    return f'bookings:{user_id}'
+
+
+class MemoryBackend:
+    """Per process backend: entries in a TTLCache, tag versions in a dict"""
+
+    name = 'memory'
+
+    def __init__(self, maxsize, ttl):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def versions(self, tags):
+        with self._lock:
+            return [self._versions.get(tag, 0) for tag in tags]
+
+    def invalidate(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, entry):
+        self.entries.set(key, entry)
+
+    def size(self):
+        return len(self.entries)
+
+
+class RedisBackend:
+    """Backend shared by all processes through Redis"""
+
+    name = 'redis'
+
+    def __init__(self, url, ttl, prefix='response-cache:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.client.ping()
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _tag_key(self, tag):
+        return f'{self.prefix}tag:{tag}'
+
+    def versions(self, tags):
+        return [int(v or 0) for v in self.client.mget([self._tag_key(tag) for tag in tags])]
+
+    def invalidate(self, tags):
+        pipe = self.client.pipeline(transaction=False)
+        for tag in tags:
+            pipe.incr(self._tag_key(tag))
+        pipe.execute()
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, entry):
+        self.client.setex(self.prefix + key, self.ttl, json.dumps(entry))
+
+    def size(self):
+        return None
+
+
+class _Metrics:
+    """Hit and miss counters per endpoint"""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, hit):
+        with self._lock:
+            counts = self._counts.setdefault(endpoint, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = {
+                endpoint: {"hits": hits, "misses": misses}
+                for endpoint, (hits, misses) in self._counts.items()
+            }
+        hits = sum(e["hits"] for e in endpoints.values())
+        misses = sum(e["misses"] for e in endpoints.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "endpoints": endpoints,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+metrics = _Metrics()
+
+
+def init_app(app):
+    """Create the configured backend and register it on the app"""
+    kind = app.config.get('RESPONSE_CACHE_BACKEND', 'memory')
+    ttl = app.config.get('RESPONSE_CACHE_TTL', 60)
+    backend = None
+    if kind == 'redis':
+        try:
+            backend = RedisBackend(app.config.get('REDIS_URL', 'redis://localhost:6379/0'), ttl)
+        except Exception as e:
+            print(f"Warning: Redis response cache unavailable, using memory: {e}")
+            kind = 'memory'
+    if kind == 'memory':
+        backend = MemoryBackend(app.config.get('RESPONSE_CACHE_MAXSIZE', 2048), ttl)
+    app.extensions['response_cache'] = backend
+
+
+def _backend():
+    return current_app.extensions.get('response_cache')
+
+
+def request_key():
+    """Path and query string with arguments sorted and empty values dropped"""
+    args = sorted((k, v) for k, v in request.args.items(multi=True) if v != '')
+    return f'{request.host}{request.path}?{urlencode(args)}'
+
+
+def _versioned_key(backend, tags):
+    versions = backend.versions(tags)
+    raw = request_key() + '|' + ','.join(f'{tag}={v}' for tag, v in zip(tags, versions))
+    raw += '|' + g.get('etag', '')
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def cached(tags):
+    """
+    Cache a view's 200 responses under the current request key.
+
+    `tags` is a list, or a callable receiving the view arguments and
+    returning one, naming what the response depends on.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**view_args):
+            backend = _backend()
+            if backend is None:
+                return view(**view_args)
+
+            tag_list = tags(**view_args) if callable(tags) else tags
+            # Computed before the view reads the database, so a write that
+            # commits meanwhile bumps a version and the entry is never served
+            key = _versioned_key(backend, tag_list)
+            entry = backend.get(key)
+            if entry is not None:
+                metrics.record(request.endpoint, hit=True)
+                body, headers = entry
+                response = current_app.response_class(body, status=200, headers=headers)
+                response.headers[CACHE_HEADER] = 'HIT'
+                return response
+
+            metrics.record(request.endpoint, hit=False)
+            response = current_app.make_response(view(**view_args))
+            if response.status_code == 200 and not response.is_streamed:
+                headers = [(k, v) for k, v in response.headers.items() if k.lower() not in _SKIPPED_HEADERS]
+                backend.set(key, (response.get_data(as_text=True), headers))
+            response.headers[CACHE_HEADER] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def invalidate(*tags):
+    """Expire every cached response carrying any of the tags"""
+    backend = _backend()
+    if backend is not None and tags:
+        backend.invalidate(tags)
+
+
+def stats_response():
+    backend = _backend()
+    stats = metrics.snapshot()
+    stats["backend"] = backend.name if backend else None
+    stats["entries"] = backend.size() if backend else 0
+    return jsonify(stats)
@@ -0,0 +1,233 @@
+"""
+Incrementally maintained rollup tables.
+
+Booking and venue writes are translated into deltas against
+dashboard_stats (one row per user) and venue_daily_stats (one row per
+venue per booking date); review writes into venue_rating_daily (one row
+per venue per review date); notification writes into notification_stats
+(unread count per user). Deltas are applied with upserts on the flush
+connection, so rollups commit or roll back together with the write that
+caused them and reads never touch the raw booking table.
+
+For a change, the contribution of the row's old state is subtracted and
+that of its new state added; reconcile.py rebuilds everything from
+scratch if the rollups ever drift.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import event, inspect, select, update, insert
+
+from models import (Venue, Booking, Review, Notification, DashboardStats, VenueDailyStats, VenueRatingDaily,
+                    NotificationStats)
+
+
+def upsert_add(connection, table, key, deltas):
+    """Add deltas to the row identified by key, creating it if missing"""
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'mysql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.mysql import insert as dialect_insert
+        stmt = dialect_insert(table).values(**key, **deltas)
+        increments = {name: table.c[name] + value for name, value in deltas.items()}
+        if dialect == 'sqlite':
+            stmt = stmt.on_conflict_do_update(index_elements=list(key), set_=increments)
+        else:
+            stmt = stmt.on_duplicate_key_update(increments)
+        connection.execute(stmt)
+        return
+
+    # Generic fallback: update, then insert if the row did not exist yet
+    result = connection.execute(
+        update(table)
+        .where(*[table.c[name] == value for name, value in key.items()])
+        .values({name: table.c[name] + value for name, value in deltas.items()})
+    )
+    if not result.rowcount:
+        connection.execute(insert(table).values(**key, **deltas))
+
+
+def upsert_add_many(connection, table, key_names, rows):
+    """
+    upsert_add for many rows in one statement. Each row holds the key
+    columns in key_names and the deltas for the other columns.
+    """
+    if not rows:
+        return
+    dialect = connection.dialect.name
+    if dialect not in ('sqlite', 'mysql'):
+        for row in rows:
+            upsert_add(connection, table, {name: row[name] for name in key_names},
+                       {name: value for name, value in row.items() if name not in key_names})
+        return
+
+    delta_names = [name for name in rows[0] if name not in key_names]
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key_names),
+            set_={name: table.c[name] + stmt.excluded[name] for name in delta_names}
+        )
+    else:
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        stmt = dialect_insert(table).values(rows)
+        stmt = stmt.on_duplicate_key_update({name: table.c[name] + stmt.inserted[name] for name in delta_names})
+    connection.execute(stmt)
+
+
+def _apply(connection, changes):
+    for (table, key), deltas in changes.items():
+        deltas = {name: value for name, value in deltas.items() if value}
+        if deltas:
+            upsert_add(connection, table, dict(key), deltas)
+
+
+def _previous(state, attr):
+    history = state.attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(state.object, attr)
+
+
+def _venue_owner(connection, venue_id, owners):
+    if venue_id not in owners:
+        owners[venue_id] = connection.execute(
+            select(Venue.user_id).where(Venue.v_no == venue_id)
+        ).scalar()
+    return owners[venue_id]
+
+
+def _add_booking(changes, connection, owners, snapshot, sign):
+    """Accumulate sign * the rollup contribution of a booking state"""
+    venue_id, player_id, day, status, amount = snapshot
+    completed = status == 'completed'
+    revenue = (amount or 0) if completed else 0
+
+    player = changes[(DashboardStats.__table__, (('user_id', player_id),))]
+    player['player_bookings'] += sign
+    player['player_completed'] += sign * completed
+
+    owner_id = _venue_owner(connection, venue_id, owners)
+    if owner_id is not None:
+        owner = changes[(DashboardStats.__table__, (('user_id', owner_id),))]
+        owner['venue_bookings'] += sign
+        owner['venue_revenue'] += sign * revenue
+
+    daily = changes[(VenueDailyStats.__table__, (('venue_id', venue_id), ('day', day)))]
+    daily['bookings'] += sign
+    daily['completed'] += sign * completed
+    daily['revenue'] += sign * revenue
+
+
+_BOOKING_FIELDS = ('venue_id', 'player_id', 'st_date', 'status', 'total_amount')
+
+
+def _booking_change(connection, old=None, new=None):
+    changes = defaultdict(lambda: defaultdict(int))
+    owners = {}
+    if old is not None:
+        _add_booking(changes, connection, owners, old, -1)
+    if new is not None:
+        _add_booking(changes, connection, owners, new, 1)
+    _apply(connection, changes)
+
+
+@event.listens_for(Booking, 'after_insert')
+def _booking_inserted(mapper, connection, target):
+    _booking_change(connection, new=tuple(getattr(target, f) for f in _BOOKING_FIELDS))
+
+
+@event.listens_for(Booking, 'after_update')
+def _booking_updated(mapper, connection, target):
+    state = inspect(target)
+    old = tuple(_previous(state, f) for f in _BOOKING_FIELDS)
+    new = tuple(getattr(target, f) for f in _BOOKING_FIELDS)
+    if old != new:
+        _booking_change(connection, old=old, new=new)
+
+
+@event.listens_for(Booking, 'after_delete')
+def _booking_deleted(mapper, connection, target):
+    _booking_change(connection, old=tuple(getattr(target, f) for f in _BOOKING_FIELDS))
+
+
+def _owned_venue_delta(connection, user_id, sign):
+    upsert_add(connection, DashboardStats.__table__, {'user_id': user_id}, {'owned_venues': sign})
+
+
+@event.listens_for(Venue, 'after_insert')
+def _venue_inserted(mapper, connection, target):
+    _owned_venue_delta(connection, target.user_id, 1)
+
+
+@event.listens_for(Venue, 'after_update')
+def _venue_updated(mapper, connection, target):
+    old_owner = _previous(inspect(target), 'user_id')
+    if old_owner != target.user_id:
+        _owned_venue_delta(connection, old_owner, -1)
+        _owned_venue_delta(connection, target.user_id, 1)
+
+
+@event.listens_for(Venue, 'after_delete')
+def _venue_deleted(mapper, connection, target):
+    _owned_venue_delta(connection, target.user_id, -1)
+
+
+def _review_day(created_at):
+    # Python-side default, so it is set on the instance by the time of the flush
+    return (created_at or datetime.utcnow()).date()
+
+
+def _rating_delta(connection, venue_id, day, rating, sign):
+    upsert_add(connection, VenueRatingDaily.__table__, {'venue_id': venue_id, 'day': day},
+               {'rating_sum': sign * rating, 'rating_count': sign})
+
+
+@event.listens_for(Review, 'after_insert')
+def _review_inserted(mapper, connection, target):
+    _rating_delta(connection, target.venue_id, _review_day(target.created_at), target.rating, 1)
+
+
+@event.listens_for(Review, 'after_update')
+def _review_updated(mapper, connection, target):
+    state = inspect(target)
+    old = tuple(_previous(state, f) for f in ('venue_id', 'created_at', 'rating'))
+    new = (target.venue_id, target.created_at, target.rating)
+    if old != new:
+        _rating_delta(connection, old[0], _review_day(old[1]), old[2], -1)
+        _rating_delta(connection, new[0], _review_day(new[1]), new[2], 1)
+
+
+@event.listens_for(Review, 'after_delete')
+def _review_deleted(mapper, connection, target):
+    _rating_delta(connection, target.venue_id, _review_day(target.created_at), target.rating, -1)
+
+
+def _unread_delta(connection, user_id, sign):
+    upsert_add(connection, NotificationStats.__table__, {'user_id': user_id}, {'unread': sign})
+
+
+@event.listens_for(Notification, 'after_insert')
+def _notification_inserted(mapper, connection, target):
+    if not target.is_read:
+        _unread_delta(connection, target.user_id, 1)
+
+
+@event.listens_for(Notification, 'after_update')
+def _notification_updated(mapper, connection, target):
+    state = inspect(target)
+    old = (_previous(state, 'user_id'), bool(_previous(state, 'is_read')))
+    new = (target.user_id, bool(target.is_read))
+    if old != new:
+        if not old[1]:
+            _unread_delta(connection, old[0], -1)
+        if not new[1]:
+            _unread_delta(connection, new[0], 1)
+
+
+@event.listens_for(Notification, 'after_delete')
+def _notification_deleted(mapper, connection, target):
+    if not target.is_read:
+        _unread_delta(connection, target.user_id, -1)
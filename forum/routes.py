@@ -1,15 +1,28 @@
 from flask import Blueprint, jsonify, request, current_app
 from flask_login import login_required, current_user, login_user, logout_user
-from models import db, Login, Venue, Booking, Review, Match
-from flask_bcrypt import Bcrypt
-from datetime import datetime, date, time, timedelta
-from sqlalchemy import and_, or_, func
+from models import (db, Login, Venue, VenueAvailability, VenueSport, VenueAmenity, Booking, Review, Match,
+                    Notification, DashboardStats, VenueDailyStats, VenueRatingDaily, venue_names_for, venues_with_tags)
+import rollups  # registers the rollup maintenance listeners
+from booking_index import booking_index, ACTIVE_STATUSES
+import search_index
+import outbox
+import response_cache
+from response_cache import (cached, VENUES, MATCHES, USERS, AVAILABILITY, VENUE_NAMES,
+                            venue_tag, reviews_tag, bookings_tag)
+from etags import etag
+from identity import identity_cache
+from serialization import (with_serialize_options, export_response, rows_to_dicts,
+                           EXPORT_FORMATS, EXPORT_BATCH_SIZE)
+from pagination import paginate, page_response, InvalidCursor
+from availability import build_availability_grid, booking_window, free_at_filter, open_for_window, MINUTES_PER_DAY
+from passwords import password_hasher, busy_response, HashingBusy
+from venue_updates import venue_updates
+from notifications import notification_queue, mark_read, unread_count
+from datetime import datetime, date, timedelta
+from sqlalchemy import or_, func
 import os
 from werkzeug.utils import secure_filename
 
-# Initialize bcrypt
-bcrypt = Bcrypt()
-
 # Create blueprint
 api = Blueprint('api', __name__)
 
@@ -30,6 +43,52 @@ def save_profile_image(file):
         return filename
     return None
 
+def parse_free_window(args):
+    """Parse the date/start_time/duration search args into (date, start, end).
+
+    Returns None when no availability search was requested and raises
+    ValueError on malformed values.
+    """
+    if not args.get('date'):
+        return None
+    day = datetime.strptime(args['date'], "%Y-%m-%d").date()
+    start_time = datetime.strptime(args.get('start_time', ''), "%H:%M").time()
+    duration_hours = int(args.get('duration', 1))
+    if duration_hours < 1:
+        raise ValueError("duration must be at least 1 hour")
+    return day, start_time, booking_window(day, start_time, duration_hours)
+
+# Keyset orderings for paginated lists, each ending with the primary key
+VENUE_PAGE_ORDER = ((Venue.created_at, False), (Venue.v_no, False))
+BOOKING_PAGE_ORDER = ((Booking.st_date, True), (Booking.start_time, True), (Booking.Bno, True))
+REVIEW_PAGE_ORDER = ((Review.created_at, True), (Review.review_id, True))
+MATCH_PAGE_ORDER = ((Match.date, False), (Match.start_time, False), (Match.id, False))
+NOTIFICATION_PAGE_ORDER = ((Notification.created_at, True), (Notification.id, True))
+
+def venue_page(query, window, order=VENUE_PAGE_ORDER, row_key=None):
+    """Fetch one page of Venue.columns_query rows, keeping only those open and unbooked during window"""
+    if window is None:
+        return paginate(query, order, row_key=row_key)
+    # Opening hours are free text and overrides may replace them, so they are checked in Python
+    return paginate(query.filter(free_at_filter(*window)), order, row_key=row_key,
+                    keep=lambda rows: open_for_window(rows, *window))
+
+def venue_list_tags():
+    """Cache tags of venue lists; availability searches also depend on bookings"""
+    tags = [VENUES, USERS]
+    if request.args.get('date'):
+        tags.append(AVAILABILITY)
+    return tags
+
+def venue_detail_tags(venue_id):
+    return [venue_tag(venue_id), USERS]
+
+def review_list_tags(venue_id):
+    return [reviews_tag(venue_id), USERS]
+
+# Matches embed venue names
+MATCH_LIST_TAGS = [MATCHES, VENUE_NAMES]
+
 # Authentication routes
 @api.route("/register", methods=["POST"])
 def register():
@@ -50,9 +109,11 @@ def register():
         # Check if email already exists
         if Login.query.filter_by(email=data["email"]).first():
             return jsonify({"error": "Email already registered"}), 409
+        # Give the pooled connection back while hashing
+        db.session.rollback()
         
         # Hash password
-        password_hash = bcrypt.generate_password_hash(data["password"]).decode('utf-8')
+        password_hash = password_hasher.hash_password(data["password"])
         
         # Create new user
         new_user = Login(
@@ -72,6 +133,8 @@ def register():
             "user": new_user.to_dict()
         }), 201
         
+    except HashingBusy as e:
+        return busy_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": f"Registration failed: {str(e)}"}), 500
@@ -86,12 +149,20 @@ def login():
             return jsonify({"error": "Email and password required"}), 400
         
         # Find user by email
-        user = Login.query.filter_by(email=data["email"]).first()
-        if not user:
+        account = db.session.query(Login.sr_no, Login.password_hash).filter_by(email=data["email"]).first()
+        if not account:
             return jsonify({"error": "Invalid credentials"}), 401
+        # Give the pooled connection back while hashing
+        db.session.rollback()
         
         # Verify password
-        if bcrypt.check_password_hash(user.password_hash, data["password"]):
+        matches, new_hash = password_hasher.verify_password(account.password_hash, data["password"])
+        if matches:
+            user = db.session.get(Login, account.sr_no)
+            if new_hash:
+                # Hashed at an older cost; store it at the current one
+                user.password_hash = new_hash
+                db.session.commit()
             login_user(user)
             return jsonify({
                 "message": "Login successful",
@@ -100,7 +171,10 @@ def login():
         else:
             return jsonify({"error": "Invalid credentials"}), 401
             
+    except HashingBusy as e:
+        return busy_response(e)
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": f"Login failed: {str(e)}"}), 500
 
 @api.route("/logout", methods=["POST"])
@@ -108,11 +182,17 @@ def login():
 def logout():
     """User logout endpoint"""
     try:
+        identity_cache.invalidate(current_user.sr_no)
         logout_user()
         return jsonify({"message": "Logout successful"}), 200
     except Exception as e:
         return jsonify({"error": f"Logout failed: {str(e)}"}), 500
 
+@api.route("/auth/hash-stats", methods=["GET"])
+def get_hash_stats():
+    """Password hashing latency and rejected calls"""
+    return jsonify(password_hasher.metrics.snapshot()), 200
+
 @api.route("/user", methods=["GET"])
 @login_required
 def get_user():
@@ -125,18 +205,23 @@ def update_user():
     """Update user profile"""
     try:
         data = request.json
+        # current_user is a cached read-only principal; edit the row itself
+        user = db.session.get(Login, current_user.sr_no)
         
         # Update allowed fields
         if "fullname" in data:
-            current_user.fullname = data["fullname"]
+            user.fullname = data["fullname"]
         if "contact_number" in data:
-            current_user.contact_number = data["contact_number"]
+            user.contact_number = data["contact_number"]
         
         db.session.commit()
+        if "fullname" in data:
+            # Owner and reviewer names are embedded in cached venue and review responses
+            response_cache.invalidate(USERS)
         
         return jsonify({
             "message": "Profile updated successfully",
-            "user": current_user.to_dict()
+            "user": user.to_dict()
         }), 200
         
     except Exception as e:
@@ -145,20 +230,31 @@ def update_user():
 
 # Venue routes
 @api.route("/venues", methods=["GET"])
+@etag(venue_list_tags)
+@cached(venue_list_tags)
 def get_venues():
     """Get all venues with optional filtering"""
     try:
         # Get query parameters
         sport = request.args.get('sport')
+        amenities = request.args.get('amenities')
         min_price = request.args.get('min_price')
         max_price = request.args.get('max_price')
         rating = request.args.get('rating')
+        try:
+            window = parse_free_window(request.args)
+        except ValueError:
+            return jsonify({"error": "Invalid date, start_time or duration"}), 400
         
         # Build query
-        query = Venue.query
+        query = Venue.columns_query()
         
         if sport:
-            query = query.filter(Venue.sports.contains(sport))
+            # Any of the comma separated sports
+            query = query.filter(Venue.v_no.in_(venues_with_tags(VenueSport, sport)))
+        if amenities:
+            # All of the comma separated amenities
+            query = query.filter(Venue.v_no.in_(venues_with_tags(VenueAmenity, amenities, match_all=True)))
         if min_price:
             query = query.filter(Venue.per_hr_charge >= float(min_price))
         if max_price:
@@ -166,15 +262,18 @@ def get_venues():
         if rating:
             query = query.filter(Venue.rating >= float(rating))
         
-        venues = query.all()
-        venues_list = [venue.to_dict() for venue in venues]
+        venues, limit, next_cursor = venue_page(query, window)
         
-        return jsonify(venues_list), 200
+        return page_response(rows_to_dicts(venues), limit, next_cursor), 200
         
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": f"Failed to fetch venues: {str(e)}"}), 500
 
 @api.route("/venue/<int:venue_id>", methods=["GET"])
+@etag(venue_detail_tags)
+@cached(venue_detail_tags)
 def get_venue(venue_id):
     """Get specific venue by ID"""
     try:
@@ -217,6 +316,7 @@ def create_venue():
         
         db.session.add(new_venue)
         db.session.commit()
+        response_cache.invalidate(VENUES)
         
         return jsonify({
             "message": "Venue created successfully",
@@ -257,7 +357,9 @@ def update_venue(venue_id):
         if "sports" in data:
             venue.sports = data["sports"]
         
+        outbox.enqueue('venue_updated', {'venue_id': venue.v_no})
         db.session.commit()
+        response_cache.invalidate(VENUES, VENUE_NAMES, venue_tag(venue_id))
         
         return jsonify({
             "message": "Venue updated successfully",
@@ -282,6 +384,7 @@ def delete_venue(venue_id):
         
         db.session.delete(venue)
         db.session.commit()
+        response_cache.invalidate(VENUES, VENUE_NAMES, venue_tag(venue_id), reviews_tag(venue_id))
         
         return jsonify({"message": "Venue deleted successfully"}), 200
         
@@ -326,26 +429,9 @@ def create_booking():
         end_dt = start_dt + timedelta(hours=duration_hours)
         end_time = end_dt.time()
 
-        # Check if venue is available
-        existing_booking = Booking.query.filter(
-            and_(
-                Booking.venue_id == data["venue_id"],
-                Booking.st_date == booking_date,
-                Booking.status.in_(['confirmed', 'pending']),
-                or_(
-                    and_(
-                        Booking.start_time <= start_time,
-                        func.addtime(Booking.start_time, func.sec_to_time(Booking.duration * 3600)) > start_time
-                    ),
-                    and_(
-                        start_time <= Booking.start_time,
-                        func.addtime(start_time, func.sec_to_time(duration_hours * 3600)) > Booking.start_time
-                    )
-                )
-            )
-        ).first()
-        
-        if existing_booking:
+        # Check if venue is available against the database, in the booking's
+        # transaction: another process may have booked or cancelled the slot
+        if not booking_index.confirm_free(venue.v_no, booking_date, start_time, end_time):
             return jsonify({"error": "Venue is not available at this time"}), 409
         
         # Calculate total amount
@@ -366,7 +452,10 @@ def create_booking():
         )
         
         db.session.add(new_booking)
+        db.session.flush()
+        outbox.enqueue('booking_created', {'booking_id': new_booking.Bno})
         db.session.commit()
+        response_cache.invalidate(AVAILABILITY)
         
         return jsonify({
             "message": "Booking created successfully",
@@ -420,6 +509,7 @@ def review_booking(booking_id):
             existing.rating = rating
             existing.comment = comment
             db.session.commit()
+            response_cache.invalidate(VENUES, venue_tag(booking.venue_id), reviews_tag(booking.venue_id))
             return jsonify({"message": "Review updated", "review": existing.to_dict()}), 200
 
         # Create new review
@@ -432,78 +522,176 @@ def review_booking(booking_id):
             is_verified=True
         )
         db.session.add(new_review)
+        db.session.flush()
+        outbox.enqueue('review_created', {'review_id': new_review.review_id})
         db.session.commit()
+        response_cache.invalidate(VENUES, venue_tag(booking.venue_id), reviews_tag(booking.venue_id))
         return jsonify({"message": "Review created", "review": new_review.to_dict()}), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": f"Failed to create review: {str(e)}"}), 500
 
-@api.route("/venue/<int:venue_id>/ratings/last7", methods=["GET"])
-def venue_ratings_last7(venue_id):
-    """Return average rating per day for the last 7 days for a venue"""
+@api.route("/venue/<int:venue_id>/availability", methods=["GET"])
+def get_venue_availability(venue_id):
+    """Return per-day free slot masks for a venue over a date range"""
     try:
-        # Ensure venue exists
         venue = Venue.query.get(venue_id)
         if not venue:
             return jsonify({"error": "Venue not found"}), 404
 
-        today = date.today()
-        start_date = today - timedelta(days=6)
-        start_dt = datetime.combine(start_date, time.min)
+        try:
+            start_date = datetime.strptime(request.args["from"], "%Y-%m-%d").date() if request.args.get("from") else date.today()
+            end_date = datetime.strptime(request.args["to"], "%Y-%m-%d").date() if request.args.get("to") else start_date + timedelta(days=13)
+            slot_minutes = int(request.args.get("slot", 60))
+        except ValueError:
+            return jsonify({"error": "Invalid date or slot format"}), 400
 
-        rows = (
-            db.session.query(
-                func.date(Review.created_at).label('day'),
-                func.avg(Review.rating).label('avg_rating'),
-                func.count(Review.review_id).label('count')
-            )
+        if end_date < start_date:
+            return jsonify({"error": "'to' must not be before 'from'"}), 400
+        if (end_date - start_date).days >= 62:
+            return jsonify({"error": "Date range cannot exceed 62 days"}), 400
+        if slot_minutes < 15 or MINUTES_PER_DAY % slot_minutes:
+            return jsonify({"error": "Slot must be at least 15 minutes and divide a day evenly"}), 400
+
+        overrides = VenueAvailability.query.filter(
+            VenueAvailability.venue_id == venue_id,
+            VenueAvailability.date.between(start_date, end_date)
+        ).all()
+        bookings = (
+            db.session.query(Booking.st_date, Booking.start_time, Booking.end_time)
             .filter(
-                Review.venue_id == venue_id,
-                Review.created_at >= start_dt
+                Booking.venue_id == venue_id,
+                Booking.st_date.between(start_date, end_date),
+                Booking.status.in_(ACTIVE_STATUSES)
             )
-            .group_by(func.date(Review.created_at))
-            .order_by(func.date(Review.created_at).asc())
             .all()
         )
 
-        by_day = {str(r.day): {"avg_rating": float(r.avg_rating or 0), "count": int(r.count)} for r in rows}
+        return jsonify({
+            "venue_id": venue_id,
+            "from": start_date.isoformat(),
+            "to": end_date.isoformat(),
+            "slot_minutes": slot_minutes,
+            "slots_per_day": MINUTES_PER_DAY // slot_minutes,
+            "days": build_availability_grid(venue, overrides, bookings, start_date, end_date, slot_minutes)
+        }), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to fetch availability: {str(e)}"}), 500
 
-        series = []
-        for i in range(7):
-            d = start_date + timedelta(days=i)
-            key = d.isoformat()
-            data = by_day.get(key, {"avg_rating": 0.0, "count": 0})
-            series.append({
-                "date": key,
-                "day_name": d.strftime('%a'),
-                "avg_rating": round(data["avg_rating"], 2),
-                "count": data["count"],
-            })
+RATING_GRANULARITIES = ('day', 'week', 'month')
+RATING_MAX_DAYS = 366
 
-        return jsonify({"venue_id": venue_id, "series": series}), 200
+def rating_bucket(day, granularity):
+    """First day of the bucket a day falls into"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+def rating_series(venue_id, days, granularity):
+    """Average rating per bucket over the last `days` days, read from venue_rating_daily"""
+    today = date.today()
+    start_date = today - timedelta(days=days - 1)
+    rows = (
+        db.session.query(VenueRatingDaily.day, VenueRatingDaily.rating_sum, VenueRatingDaily.rating_count)
+        .filter(VenueRatingDaily.venue_id == venue_id, VenueRatingDaily.day.between(start_date, today))
+        .all()
+    )
+
+    # Every bucket in the window, in order, so gaps are reported as zero
+    buckets = {}
+    for i in range(days):
+        buckets.setdefault(rating_bucket(start_date + timedelta(days=i), granularity), [0, 0])
+    for row in rows:
+        totals = buckets[rating_bucket(row.day, granularity)]
+        totals[0] += row.rating_sum
+        totals[1] += row.rating_count
+
+    return [{
+        "date": bucket.isoformat(),
+        "day_name": bucket.strftime('%a'),
+        "avg_rating": round(rating_sum / count, 2) if count else 0.0,
+        "count": count,
+    } for bucket, (rating_sum, count) in buckets.items()]
+
+@api.route("/venue/<int:venue_id>/ratings", methods=["GET"])
+def venue_ratings(venue_id):
+    """Return average rating per day, week or month over a window of days"""
+    try:
+        days = request.args.get('days', 30, type=int)
+        granularity = request.args.get('granularity', 'day')
+        if not days or not (1 <= days <= RATING_MAX_DAYS):
+            return jsonify({"error": f"days must be between 1 and {RATING_MAX_DAYS}"}), 400
+        if granularity not in RATING_GRANULARITIES:
+            return jsonify({"error": f"granularity must be one of: {', '.join(RATING_GRANULARITIES)}"}), 400
+
+        if not db.session.query(Venue.v_no).filter_by(v_no=venue_id).first():
+            return jsonify({"error": "Venue not found"}), 404
+
+        return jsonify({
+            "venue_id": venue_id,
+            "days": days,
+            "granularity": granularity,
+            "series": rating_series(venue_id, days, granularity)
+        }), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to fetch ratings: {str(e)}"}), 500
+
+@api.route("/venue/<int:venue_id>/ratings/last7", methods=["GET"])
+def venue_ratings_last7(venue_id):
+    """Return average rating per day for the last 7 days for a venue"""
+    try:
+        if not db.session.query(Venue.v_no).filter_by(v_no=venue_id).first():
+            return jsonify({"error": "Venue not found"}), 404
+
+        return jsonify({"venue_id": venue_id, "series": rating_series(venue_id, 7, 'day')}), 200
     except Exception as e:
         return jsonify({"error": f"Failed to fetch ratings: {str(e)}"}), 500
 
+def current_user_bookings_query(query=None):
+    """Bookings visible to the current user: their own, or those at their venues"""
+    if query is None:
+        query = with_serialize_options(Booking.query, Booking)
+    if current_user.designation == "facilities":
+        # For facilities users, get bookings for their venues
+        venue_ids = db.session.query(Venue.v_no).filter_by(user_id=current_user.sr_no)
+        return query.filter(Booking.venue_id.in_(venue_ids))
+    # For players, get their own bookings
+    return query.filter(Booking.player_id == current_user.sr_no)
+
 @api.route("/bookings", methods=["GET"])
 @login_required
+@etag(lambda: [bookings_tag(current_user.sr_no), VENUE_NAMES])
 def get_bookings():
     """Get user's bookings"""
     try:
-        if current_user.designation == "facilities":
-            # For facilities users, get bookings for their venues
-            venues = Venue.query.filter_by(user_id=current_user.sr_no).all()
-            venue_ids = [v.v_no for v in venues]
-            bookings = Booking.query.filter(Booking.venue_id.in_(venue_ids)).all()
-        else:
-            # For players, get their own bookings
-            bookings = Booking.query.filter_by(player_id=current_user.sr_no).all()
-        
-        bookings_list = [booking.to_dict() for booking in bookings]
-        return jsonify(bookings_list), 200
+        bookings, limit, next_cursor = paginate(
+            current_user_bookings_query(Booking.columns_query()), BOOKING_PAGE_ORDER
+        )
+        return page_response(rows_to_dicts(bookings), limit, next_cursor), 200
         
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": f"Failed to fetch bookings: {str(e)}"}), 500
 
+@api.route("/bookings/export", methods=["GET"])
+@login_required
+def export_bookings():
+    """Stream the user's complete booking history as NDJSON or CSV"""
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"Invalid format. Must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    # Oldest first, fetched in batches over a server-side cursor
+    query = (
+        current_user_bookings_query()
+        .order_by(Booking.st_date.asc(), Booking.start_time.asc(), Booking.Bno.asc())
+        .yield_per(EXPORT_BATCH_SIZE)
+    )
+    return export_response(query, Booking.to_dict, export_format, "bookings")
+
 @api.route("/booking/<int:booking_id>", methods=["PUT"])
 @login_required
 def update_booking_status(booking_id):
@@ -527,8 +715,14 @@ def update_booking_status(booking_id):
         if data["status"] not in valid_statuses:
             return jsonify({"error": f"Invalid status. Must be one of: {', '.join(valid_statuses)}"}), 400
         
+        old_status = booking.status
         booking.status = data["status"]
+        if old_status != booking.status:
+            outbox.enqueue('booking_status_changed', {'booking_id': booking.Bno, 'old_status': old_status})
         db.session.commit()
+        if old_status != booking.status:
+            # Availability and the venue's booking counters may have changed
+            response_cache.invalidate(AVAILABILITY, VENUES, venue_tag(booking.venue_id))
         
         return jsonify({
             "message": "Booking status updated successfully",
@@ -572,7 +766,10 @@ def create_review(venue_id):
         )
         
         db.session.add(new_review)
+        db.session.flush()
+        outbox.enqueue('review_created', {'review_id': new_review.review_id})
         db.session.commit()
+        response_cache.invalidate(VENUES, venue_tag(venue_id), reviews_tag(venue_id))
         
         return jsonify({
             "message": "Review created successfully",
@@ -584,36 +781,59 @@ def create_review(venue_id):
         return jsonify({"error": f"Review creation failed: {str(e)}"}), 500
 
 @api.route("/venue/<int:venue_id>/reviews", methods=["GET"])
+@etag(review_list_tags)
+@cached(review_list_tags)
 def get_venue_reviews(venue_id):
     """Get reviews for a specific venue"""
     try:
-        reviews = Review.query.filter_by(venue_id=venue_id).all()
+        query = with_serialize_options(Review.query, Review).filter_by(venue_id=venue_id)
+        reviews, limit, next_cursor = paginate(query, REVIEW_PAGE_ORDER)
         reviews_list = [review.to_dict() for review in reviews]
-        return jsonify(reviews_list), 200
+        return page_response(reviews_list, limit, next_cursor), 200
         
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": f"Failed to fetch reviews: {str(e)}"}), 500
 
 # Search and filter routes
 @api.route("/search/venues", methods=["GET"])
+@etag(venue_list_tags)
+@cached(venue_list_tags)
 def search_venues():
-    """Search venues by name, address, or sports"""
+    """Search venues by name, address, sports or amenities"""
     try:
         query = request.args.get('q', '')
         if not query:
             return jsonify({"error": "Search query required"}), 400
-        
-        venues = Venue.query.filter(
-            or_(
-                Venue.court_name.contains(query),
-                Venue.address.contains(query),
-                Venue.sports.contains(query)
+        try:
+            window = parse_free_window(request.args)
+        except ValueError:
+            return jsonify({"error": "Invalid date, start_time or duration"}), 400
+        
+        venues_query = Venue.columns_query()
+        scores = search_index.match_scores(query) if search_index.is_enabled() else None
+        if scores is not None:
+            # Ranked full-text match, most relevant first
+            venues, limit, next_cursor = venue_page(
+                venues_query.join(scores, scores.c.v_no == Venue.v_no).add_columns(scores.c.score),
+                window,
+                order=((scores.c.score, False), (Venue.v_no, False)),
+                row_key=lambda row: [row.score, row.v_no]
             )
-        ).all()
+        else:
+            venues, limit, next_cursor = venue_page(venues_query.filter(
+                or_(
+                    Venue.court_name.contains(query),
+                    Venue.address.contains(query),
+                    Venue.sports.contains(query)
+                )
+            ), window)
         
-        venues_list = [venue.to_dict() for venue in venues]
-        return jsonify(venues_list), 200
+        return page_response(rows_to_dicts(venues, omit=('score',)), limit, next_cursor), 200
         
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": f"Search failed: {str(e)}"}), 500
 
@@ -623,31 +843,23 @@ def search_venues():
 def get_dashboard_stats():
     """Get dashboard statistics for the current user"""
     try:
+        # Maintained incrementally by rollups.py, so this is a primary key read
+        rollup = db.session.get(DashboardStats, current_user.sr_no) or DashboardStats(
+            owned_venues=0, venue_bookings=0, venue_revenue=0, player_bookings=0, player_completed=0
+        )
         if current_user.designation == "facilities":
             # Facilities user stats
-            total_venues = Venue.query.filter_by(user_id=current_user.sr_no).count()
-            total_bookings = Booking.query.join(Venue).filter(Venue.user_id == current_user.sr_no).count()
-            total_revenue = db.session.query(func.sum(Booking.total_amount)).join(Venue).filter(
-                and_(Venue.user_id == current_user.sr_no, Booking.status == 'completed')
-            ).scalar() or 0
-            
             stats = {
-                "total_venues": total_venues,
-                "total_bookings": total_bookings,
-                "total_revenue": float(total_revenue),
+                "total_venues": rollup.owned_venues,
+                "total_bookings": rollup.venue_bookings,
+                "total_revenue": float(rollup.venue_revenue or 0),
                 "user_type": "facilities"
             }
         else:
             # Player stats
-            total_bookings = Booking.query.filter_by(player_id=current_user.sr_no).count()
-            completed_bookings = Booking.query.filter_by(
-                player_id=current_user.sr_no, 
-                status='completed'
-            ).count()
-            
             stats = {
-                "total_bookings": total_bookings,
-                "completed_bookings": completed_bookings,
+                "total_bookings": rollup.player_bookings,
+                "completed_bookings": rollup.player_completed,
                 "user_type": "player"
             }
         
@@ -656,8 +868,111 @@ def get_dashboard_stats():
     except Exception as e:
         return jsonify({"error": f"Failed to fetch stats: {str(e)}"}), 500
 
+@api.route("/dashboard/revenue", methods=["GET"])
+@login_required
+def get_dashboard_revenue():
+    """Daily bookings and completed revenue across the owner's venues"""
+    try:
+        if current_user.designation != "facilities":
+            return jsonify({"error": "Only facilities users have revenue statistics"}), 403
+
+        days = request.args.get('days', 30, type=int)
+        if not days or not (1 <= days <= 366):
+            return jsonify({"error": "days must be between 1 and 366"}), 400
+        venue_id = request.args.get('venue_id', type=int)
+
+        end_date = date.today()
+        start_date = end_date - timedelta(days=days - 1)
+        query = (
+            db.session.query(
+                VenueDailyStats.day,
+                func.sum(VenueDailyStats.bookings).label('bookings'),
+                func.sum(VenueDailyStats.revenue).label('revenue')
+            )
+            .join(Venue, Venue.v_no == VenueDailyStats.venue_id)
+            .filter(Venue.user_id == current_user.sr_no, VenueDailyStats.day.between(start_date, end_date))
+        )
+        if venue_id:
+            query = query.filter(VenueDailyStats.venue_id == venue_id)
+        by_day = {row.day: row for row in query.group_by(VenueDailyStats.day)}
+
+        series = []
+        for i in range(days):
+            d = start_date + timedelta(days=i)
+            row = by_day.get(d)
+            series.append({
+                "date": d.isoformat(),
+                "bookings": int(row.bookings) if row else 0,
+                "revenue": float(row.revenue or 0) if row else 0.0,
+            })
+        return jsonify({"venue_id": venue_id, "series": series}), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to fetch revenue: {str(e)}"}), 500
+
+@api.route("/cache/stats", methods=["GET"])
+def get_cache_stats():
+    """Response cache hit/miss counters"""
+    return response_cache.stats_response(), 200
+
+@api.route("/venue-updates/stats", methods=["GET"])
+def get_venue_update_stats():
+    """Coalesced venue_update counters and buffer latency"""
+    return jsonify(venue_updates.metrics.snapshot()), 200
+
+@api.route("/notifications/queue-stats", methods=["GET"])
+def get_notification_queue_stats():
+    """Notification pipeline counters and enqueue-to-emit latency"""
+    return jsonify(notification_queue.metrics.snapshot()), 200
+
+@api.route("/notifications", methods=["GET"])
+@login_required
+def get_notifications():
+    """Current user's notifications, newest first; ?unread=true for unread ones only"""
+    try:
+        query = Notification.query.filter_by(user_id=current_user.sr_no)
+        if request.args.get('unread', '').lower() == 'true':
+            query = query.filter_by(is_read=False)
+        notifications, limit, next_cursor = paginate(query, NOTIFICATION_PAGE_ORDER)
+        return page_response([n.to_dict() for n in notifications], limit, next_cursor), 200
+
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Failed to fetch notifications: {str(e)}"}), 500
+
+@api.route("/notifications/read", methods=["POST"])
+@login_required
+def mark_notifications_read():
+    """Mark notifications read: {"ids": [...]} or {"all": true}"""
+    try:
+        data = request.json or {}
+        ids = data.get('ids')
+        if data.get('all'):
+            ids = None
+        elif not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return jsonify({"error": "Provide a list of notification ids or all: true"}), 400
+
+        updated = mark_read(current_user.sr_no, ids)
+        db.session.commit()
+        return jsonify({"updated": updated, "unread": unread_count(current_user.sr_no)}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Failed to mark notifications read: {str(e)}"}), 500
+
+@api.route("/notifications/unread-count", methods=["GET"])
+@login_required
+def get_unread_count():
+    """Number of unread notifications, read from the user's counter"""
+    try:
+        return jsonify({"unread": unread_count(current_user.sr_no)}), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to fetch unread count: {str(e)}"}), 500
+
 # Matches routes (secondary DB)
 @api.route("/matches", methods=["GET"])
+@etag(MATCH_LIST_TAGS)
+@cached(MATCH_LIST_TAGS)
 def list_matches():
     try:
         sport = request.args.get('sport')
@@ -672,8 +987,11 @@ def list_matches():
         if status:
             query = query.filter(Match.status == status)
 
-        matches = query.order_by(Match.date.asc(), Match.start_time.asc()).all()
-        return jsonify([m.to_dict() for m in matches]), 200
+        matches, limit, next_cursor = paginate(query, MATCH_PAGE_ORDER)
+        venue_names = venue_names_for(m.venue_id for m in matches)
+        return page_response([m.to_dict(venue_names) for m in matches], limit, next_cursor), 200
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": f"Failed to fetch matches: {str(e)}"}), 500
 
@@ -707,6 +1025,7 @@ def create_match():
 
         db.session.add(match)
         db.session.commit()
+        response_cache.invalidate(MATCHES)
         return jsonify({"message": "Match created", "match": match.to_dict()}), 201
     except Exception as e:
         db.session.rollback()
@@ -730,6 +1049,7 @@ def update_match(match_id):
             match.start_time = datetime.strptime(data["start_time"], "%H:%M").time()
 
         db.session.commit()
+        response_cache.invalidate(MATCHES)
         return jsonify({"message": "Match updated", "match": match.to_dict()}), 200
     except Exception as e:
         db.session.rollback()
@@ -744,6 +1064,7 @@ def delete_match(match_id):
             return jsonify({"error": "Match not found"}), 404
         db.session.delete(match)
         db.session.commit()
+        response_cache.invalidate(MATCHES)
         return jsonify({"message": "Match deleted"}), 200
     except Exception as e:
         db.session.rollback()
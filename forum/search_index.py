@@ -0,0 +1,195 @@
+"""
+Full-text search over venues.
+
+On SQLite the venue text columns are mirrored into an FTS5 table
+(venue_fts) kept in sync by triggers; on MySQL a FULLTEXT index on the
+venue table is used. Both are created by ensure_search_index, which
+migrate.py and init_db.py call.
+
+Queries are split into words and matched as prefixes, so "badm" finds
+"Badminton". Words that are not a prefix of any indexed term are replaced
+by their closest indexed term, which absorbs most typos ("tenis" ->
+"tennis"). Results are ranked by relevance with the court name weighted
+highest. If the index does not exist yet, callers fall back to LIKE.
+"""
+
+import difflib
+import re
+from bisect import bisect_left
+
+from sqlalchemy import Float, column, event, inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from caching import TTLCache
+from models import db, Venue
+
+SEARCH_COLUMNS = ('court_name', 'address', 'sports', 'amenities')
+FTS_TABLE = 'venue_fts'
+VOCAB_TABLE = 'venue_fts_vocab'
+MYSQL_FULLTEXT_INDEX = 'ft_venue_search'
+
+# bm25 weights in SEARCH_COLUMNS order
+_SQLITE_WEIGHTS = '10.0, 2.0, 5.0, 1.0'
+
+_SQLITE_SETUP = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        court_name, address, sports, amenities,
+        content='venue', content_rowid='v_no',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {VOCAB_TABLE} USING fts5vocab({FTS_TABLE}, 'row')",
+    f"""CREATE TRIGGER IF NOT EXISTS venue_fts_ai AFTER INSERT ON venue BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, court_name, address, sports, amenities)
+        VALUES (new.v_no, new.court_name, new.address, new.sports, new.amenities);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS venue_fts_ad AFTER DELETE ON venue BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, court_name, address, sports, amenities)
+        VALUES ('delete', old.v_no, old.court_name, old.address, old.sports, old.amenities);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS venue_fts_au AFTER UPDATE OF court_name, address, sports, amenities ON venue BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, court_name, address, sports, amenities)
+        VALUES ('delete', old.v_no, old.court_name, old.address, old.sports, old.amenities);
+        INSERT INTO {FTS_TABLE}(rowid, court_name, address, sports, amenities)
+        VALUES (new.v_no, new.court_name, new.address, new.sports, new.amenities);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+_vocabulary_cache = TTLCache(maxsize=1, ttl=300)
+_enabled = {}
+
+
+def _dialect():
+    return db.engine.dialect.name
+
+
+def ensure_search_index():
+    """Create the full-text index for the primary database; returns what was done"""
+    engine = db.engine
+    if engine.dialect.name == 'sqlite':
+        with engine.begin() as conn:
+            for statement in _SQLITE_SETUP:
+                conn.execute(text(statement))
+        created = f'{FTS_TABLE} (FTS5)'
+    elif engine.dialect.name == 'mysql':
+        existing = {ix['name'] for ix in inspect(engine).get_indexes('venue')}
+        if MYSQL_FULLTEXT_INDEX in existing:
+            return []
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"ALTER TABLE venue ADD FULLTEXT INDEX {MYSQL_FULLTEXT_INDEX} ({', '.join(SEARCH_COLUMNS)})"
+            ))
+        created = f'{MYSQL_FULLTEXT_INDEX} (FULLTEXT)'
+    else:
+        return []
+    _enabled[str(engine.url)] = True
+    invalidate_vocabulary()
+    return [created]
+
+
+def check_search_index(app):
+    """Look up once at startup whether the index exists, so requests never do"""
+    with app.app_context():
+        is_enabled()
+
+
+def is_enabled():
+    """True if the full-text index exists for the current database"""
+    url = str(db.engine.url)
+    if url not in _enabled:
+        try:
+            if _dialect() == 'sqlite':
+                _enabled[url] = inspect(db.engine).has_table(FTS_TABLE)
+            elif _dialect() == 'mysql':
+                _enabled[url] = MYSQL_FULLTEXT_INDEX in {
+                    ix['name'] for ix in inspect(db.engine).get_indexes('venue')
+                }
+            else:
+                _enabled[url] = False
+        except SQLAlchemyError:
+            # Not remembered, so a database that was down at startup is checked again
+            return False
+    return _enabled[url]
+
+
+def _load_vocabulary():
+    if _dialect() == 'sqlite':
+        rows = db.session.execute(text(f"SELECT term FROM {VOCAB_TABLE}"))
+        return sorted(row.term for row in rows)
+    # MySQL does not expose its FULLTEXT vocabulary without extra server
+    # settings, so build it from the indexed columns
+    terms = set()
+    rows = db.session.query(*[getattr(Venue, name) for name in SEARCH_COLUMNS])
+    for row in rows.yield_per(1000):
+        for value in row:
+            terms.update(word.lower() for word in _WORD_RE.findall(value or ''))
+    return sorted(terms)
+
+
+def vocabulary():
+    """Sorted list of indexed terms, cached until a venue is written"""
+    terms = _vocabulary_cache.get('terms')
+    if terms is None:
+        terms = _load_vocabulary()
+        _vocabulary_cache.set('terms', terms)
+    return terms
+
+
+def invalidate_vocabulary():
+    _vocabulary_cache.clear()
+
+
+def _has_prefix(terms, word):
+    idx = bisect_left(terms, word)
+    return idx < len(terms) and terms[idx].startswith(word)
+
+
+def correct_terms(words):
+    """Replace words that match no indexed term with their closest term"""
+    terms = vocabulary()
+    corrected = []
+    for word in words:
+        if len(word) < 3 or _has_prefix(terms, word):
+            corrected.append(word)
+            continue
+        # Only compare against terms of similar length sharing the first letter
+        lo = bisect_left(terms, word[0])
+        hi = bisect_left(terms, chr(ord(word[0]) + 1))
+        candidates = [t for t in terms[lo:hi] if abs(len(t) - len(word)) <= 2]
+        matches = difflib.get_close_matches(word, candidates, n=1, cutoff=0.75)
+        corrected.append(matches[0] if matches else word)
+    return corrected
+
+
+def match_scores(query_text):
+    """
+    Selectable of (v_no, score) for venues matching query_text, or None if
+    the query has no searchable words. Lower scores rank higher.
+    """
+    words = correct_terms([w.lower() for w in _WORD_RE.findall(query_text)])
+    if not words:
+        return None
+
+    if _dialect() == 'sqlite':
+        match = ' '.join(f'"{word}"*' for word in words)
+        scores = text(
+            f"SELECT rowid AS v_no, bm25({FTS_TABLE}, {_SQLITE_WEIGHTS}) AS score "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+        ).bindparams(match=match)
+    else:
+        match = ' '.join(f'+{word}*' for word in words)
+        columns = ', '.join(SEARCH_COLUMNS)
+        scores = text(
+            f"SELECT v_no, -MATCH({columns}) AGAINST (:match IN BOOLEAN MODE) AS score "
+            f"FROM venue WHERE MATCH({columns}) AGAINST (:match IN BOOLEAN MODE)"
+        ).bindparams(match=match)
+    return scores.columns(column('v_no', db.Integer), column('score', Float)).subquery('venue_scores')
+
+
+@event.listens_for(Venue, 'after_insert')
+@event.listens_for(Venue, 'after_update')
+@event.listens_for(Venue, 'after_delete')
+def _venue_text_changed(mapper, connection, target):
+    invalidate_vocabulary()
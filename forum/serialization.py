@@ -0,0 +1,103 @@
+"""
+Helpers for serializing lists of models without N+1 queries.
+
+Each model lists the relationships its to_dict reads in
+`serialize_relations`. List endpoints build their queries with
+with_serialize_options so those relationships are fetched up front in
+batched IN queries rather than lazily once per row.
+
+The hottest lists skip ORM entities altogether: the model's
+columns_query() selects to_dict's fields as plain row tuples, rows_to_dicts
+zips them with the column names and json_response encodes the result with
+orjson when it is installed, or with the standard library otherwise. orjson
+encodes dates and times itself but not Decimals (money columns), so both
+encoders need the _default hook, which turns Decimals into floats.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from flask import Response, stream_with_context
+from sqlalchemy.orm import selectinload
+
+try:
+    import orjson
+except ImportError:  # optional speedup, the stdlib encoder is used instead
+    orjson = None
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+EXPORT_BATCH_SIZE = 1000
+
+
+def serialize_options(model):
+    """Loader options for the relationships model.to_dict touches"""
+    return [selectinload(getattr(model, name)) for name in getattr(model, 'serialize_relations', ())]
+
+
+def with_serialize_options(query, model):
+    """Apply serialize_options(model) to a query"""
+    return query.options(*serialize_options(model))
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(data):
+    """Encode data as compact JSON bytes with sorted keys, like jsonify"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(data, default=_default, sort_keys=True, separators=(',', ':')).encode()
+
+
+def json_response(data, status=200):
+    return Response(dumps(data), status=status, mimetype='application/json')
+
+
+def rows_to_dicts(rows, omit=()):
+    """Dicts keyed by column label for rows of a columns_query, minus omitted columns"""
+    if not rows:
+        return []
+    names = list(rows[0]._fields)
+    if omit:
+        keep = [i for i, name in enumerate(names) if name not in omit]
+        names = [names[i] for i in keep]
+        return [dict(zip(names, [row[i] for i in keep])) for row in rows]
+    return [dict(zip(names, row)) for row in rows]
+
+
+def iter_ndjson(rows, serialize):
+    for row in rows:
+        yield json.dumps(serialize(row), separators=(',', ':')) + '\n'
+
+
+def iter_csv(rows, serialize):
+    buffer = io.StringIO()
+    writer = None
+    for row in rows:
+        record = serialize(row)
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(record))
+            writer.writeheader()
+        writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def export_response(query, serialize, export_format, filename):
+    """Streaming attachment response emitting one line per row of query"""
+    if export_format == 'csv':
+        body, mimetype = iter_csv(query, serialize), 'text/csv'
+    else:
+        body, mimetype = iter_ndjson(query, serialize), 'application/x-ndjson'
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}.{export_format}'
+    return response
@@ -1,32 +1,31 @@
+from flask import current_app, request
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_login import current_user
-from models import db, Notification, Booking, Venue, Login
+from models import Booking, Login
+from presence import presence
+from venue_updates import venue_updates
+from notifications import notification_queue
 from datetime import datetime
-import json
 
 socketio = SocketIO(cors_allowed_origins="*")
 
-# Store connected users
-connected_users = {}
-
 @socketio.on('connect')
 def handle_connect():
     """Handle client connection"""
-    print(f"Client connected: {request.sid}")
+    current_app.logger.debug(f"Client connected: {request.sid}")
     if current_user.is_authenticated:
         user_id = current_user.sr_no
-        connected_users[request.sid] = user_id
+        presence.connect(request.sid, user_id)
         join_room(f"user_{user_id}")
         emit('connected', {'message': 'Connected to real-time updates'})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
-    print(f"Client disconnected: {request.sid}")
-    if request.sid in connected_users:
-        user_id = connected_users[request.sid]
+    current_app.logger.debug(f"Client disconnected: {request.sid}")
+    user_id = presence.disconnect(request.sid)
+    if user_id is not None:
         leave_room(f"user_{user_id}")
-        del connected_users[request.sid]
 
 @socketio.on('join_venue')
 def handle_join_venue(data):
@@ -45,161 +44,109 @@ def handle_leave_venue(data):
         emit('left_venue', {'venue_id': venue_id})
 
 def send_notification(user_id, title, message, notification_type, data=None):
-    """Send notification to specific user"""
-    try:
-        # Create notification in database
-        notification = Notification(
-            user_id=user_id,
-            title=title,
-            message=message,
-            type=notification_type,
-            data=json.dumps(data) if data else None
-        )
-        db.session.add(notification)
-        db.session.commit()
-        
-        # Send real-time notification
-        socketio.emit('new_notification', notification.to_dict(), room=f"user_{user_id}")
-        
-        return notification
-    except Exception as e:
-        print(f"Error sending notification: {e}")
-        db.session.rollback()
-        return None
+    """Add a notification for a user to the current transaction; it is stored and pushed when that commits"""
+    notification_queue.notify(user_id, title, message, notification_type, data)
 
 def broadcast_venue_update(venue_id, update_type, data):
-    """Broadcast venue updates to all users watching that venue"""
-    socketio.emit('venue_update', {
-        'venue_id': venue_id,
-        'type': update_type,
-        'data': data,
-        'timestamp': datetime.utcnow().isoformat()
-    }, room=f"venue_{venue_id}")
+    """Broadcast venue updates to all users watching that venue, coalesced per room"""
+    venue_updates.add(venue_id, update_type, data)
 
 def broadcast_booking_update(booking_id, update_type, data):
     """Broadcast booking updates"""
-    try:
-        booking = Booking.query.get(booking_id)
-        if booking:
-            # Notify venue owner
-            venue_owner_id = booking.venue.user_id
-            socketio.emit('booking_update', {
-                'booking_id': booking_id,
-                'type': update_type,
-                'data': data,
-                'timestamp': datetime.utcnow().isoformat()
-            }, room=f"user_{venue_owner_id}")
-            
-            # Notify booking user
-            socketio.emit('booking_update', {
-                'booking_id': booking_id,
-                'type': update_type,
-                'data': data,
-                'timestamp': datetime.utcnow().isoformat()
-            }, room=f"user_{booking.player_id}")
-    except Exception as e:
-        print(f"Error broadcasting booking update: {e}")
+    booking = Booking.query.get(booking_id)
+    if booking:
+        # Notify venue owner
+        venue_owner_id = booking.venue.user_id
+        socketio.emit('booking_update', {
+            'booking_id': booking_id,
+            'type': update_type,
+            'data': data,
+            'timestamp': datetime.utcnow().isoformat()
+        }, room=f"user_{venue_owner_id}")
+        
+        # Notify booking user
+        socketio.emit('booking_update', {
+            'booking_id': booking_id,
+            'type': update_type,
+            'data': data,
+            'timestamp': datetime.utcnow().isoformat()
+        }, room=f"user_{booking.player_id}")
 
 def broadcast_system_message(message, user_ids=None):
-    """Broadcast system message to specific users or all users"""
-    if user_ids:
-        for user_id in user_ids:
-            socketio.emit('system_message', {
-                'message': message,
-                'timestamp': datetime.utcnow().isoformat()
-            }, room=f"user_{user_id}")
-    else:
-        socketio.emit('system_message', {
-            'message': message,
-            'timestamp': datetime.utcnow().isoformat()
-        })
+    """Add a system message for specific users or all users to the current transaction"""
+    notification_queue.announce(message, user_ids)
 
-# Event handlers for database changes
+# Event handlers for database changes, run by the outbox worker. Errors propagate
+# so the outbox keeps the event and retries it.
 def on_booking_created(booking):
     """Handle new booking creation"""
-    try:
-        # Notify venue owner
-        venue_owner = booking.venue.owner
+    # Notify venue owner
+    venue_owner = booking.venue.owner
+    send_notification(
+        venue_owner.sr_no,
+        "New Booking Request",
+        f"New booking request for {booking.venue.court_name} on {booking.st_date}",
+        "booking",
+        {"booking_id": booking.Bno, "venue_id": booking.venue_id}
+    )
+    
+    # Broadcast venue update
+    broadcast_venue_update(booking.venue_id, "new_booking", booking.to_dict())
+
+def on_booking_status_changed(booking, old_status):
+    """Handle booking status changes"""
+    # Notify user about status change
+    status_messages = {
+        'confirmed': f"Your booking for {booking.venue.court_name} has been confirmed!",
+        'cancelled': f"Your booking for {booking.venue.court_name} has been cancelled.",
+        'completed': f"Your booking for {booking.venue.court_name} has been completed.",
+        'no_show': f"Your booking for {booking.venue.court_name} was marked as no-show."
+    }
+    
+    if booking.status in status_messages:
         send_notification(
-            venue_owner.sr_no,
-            "New Booking Request",
-            f"New booking request for {booking.venue.court_name} on {booking.st_date}",
+            booking.player_id,
+            f"Booking {booking.status.title()}",
+            status_messages[booking.status],
             "booking",
             {"booking_id": booking.Bno, "venue_id": booking.venue_id}
         )
-        
-        # Broadcast venue update
-        broadcast_venue_update(booking.venue_id, "new_booking", booking.to_dict())
-        
-    except Exception as e:
-        print(f"Error handling booking creation: {e}")
-
-def on_booking_status_changed(booking, old_status):
-    """Handle booking status changes"""
-    try:
-        # Notify user about status change
-        status_messages = {
-            'confirmed': f"Your booking for {booking.venue.court_name} has been confirmed!",
-            'cancelled': f"Your booking for {booking.venue.court_name} has been cancelled.",
-            'completed': f"Your booking for {booking.venue.court_name} has been completed.",
-            'no_show': f"Your booking for {booking.venue.court_name} was marked as no-show."
-        }
-        
-        if booking.status in status_messages:
-            send_notification(
-                booking.player_id,
-                f"Booking {booking.status.title()}",
-                status_messages[booking.status],
-                "booking",
-                {"booking_id": booking.Bno, "venue_id": booking.venue_id}
-            )
-        
-        # Broadcast booking update
-        broadcast_booking_update(booking.Bno, "status_changed", {
-            "old_status": old_status,
-            "new_status": booking.status,
-            "booking": booking.to_dict()
-        })
-        
-    except Exception as e:
-        print(f"Error handling booking status change: {e}")
+    
+    # Broadcast booking update
+    broadcast_booking_update(booking.Bno, "status_changed", {
+        "old_status": old_status,
+        "new_status": booking.status,
+        "booking": booking.to_dict()
+    })
 
 def on_review_created(review):
     """Handle new review creation"""
-    try:
-        # Notify venue owner
-        venue_owner = review.venue.owner
-        send_notification(
-            venue_owner.sr_no,
-            "New Review",
-            f"New {review.rating}-star review for {review.venue.court_name}",
-            "review",
-            {"review_id": review.review_id, "venue_id": review.venue_id}
-        )
-        
-        # Broadcast venue update
-        broadcast_venue_update(review.venue_id, "new_review", review.to_dict())
-        
-    except Exception as e:
-        print(f"Error handling review creation: {e}")
+    # Notify venue owner
+    venue_owner = review.venue.owner
+    send_notification(
+        venue_owner.sr_no,
+        "New Review",
+        f"New {review.rating}-star review for {review.venue.court_name}",
+        "review",
+        {"review_id": review.review_id, "venue_id": review.venue_id}
+    )
+    
+    # Broadcast venue update
+    broadcast_venue_update(review.venue_id, "new_review", review.to_dict())
 
 def on_venue_updated(venue):
     """Handle venue updates"""
-    try:
-        # Broadcast venue update to all users watching this venue
-        broadcast_venue_update(venue.v_no, "venue_updated", venue.to_dict())
-        
-    except Exception as e:
-        print(f"Error handling venue update: {e}")
+    # Broadcast venue update to all users watching this venue
+    broadcast_venue_update(venue.v_no, "venue_updated", venue.to_dict())
 
 # Utility functions for real-time features
 def get_online_users():
     """Get list of online users"""
-    return list(set(connected_users.values()))
+    return presence.online_users()
 
 def is_user_online(user_id):
     """Check if user is online"""
-    return user_id in connected_users.values()
+    return presence.is_online(user_id)
 
 def send_typing_indicator(venue_id, user_id, is_typing):
     """Send typing indicator for chat features"""
@@ -221,4 +168,4 @@ def send_chat_message(venue_id, user_id, message):
             'timestamp': datetime.utcnow().isoformat()
         }, room=f"venue_{venue_id}")
     except Exception as e:
-        print(f"Error sending chat message: {e}")
+        current_app.logger.exception(f"Error sending chat message: {e}")
@@ -0,0 +1,55 @@
+import { useCallback, useEffect, useRef, useState } from 'react';
+
+// A cursor paginated list loaded one page at a time. fetchPage(cursor) resolves
+// to { items, nextCursor } (see apiService.requestPage); the first page is loaded
+// whenever deps change and loadMore appends the next one.
+export default function usePagedList(fetchPage, deps = []) {
+  const [items, setItems] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [error, setError] = useState(null);
+  // Responses of a list that has since been reloaded are ignored
+  const generation = useRef(0);
+
+  const reload = useCallback(() => {
+    const current = ++generation.current;
+    setLoading(true);
+    setError(null);
+    return fetchPage(null)
+      .then((page) => {
+        if (current !== generation.current) return;
+        setItems(page.items || []);
+        setNextCursor(page.nextCursor);
+      })
+      .catch((err) => {
+        if (current === generation.current) setError(err.message);
+      })
+      .finally(() => {
+        if (current === generation.current) setLoading(false);
+      });
+  }, deps); // eslint-disable-line react-hooks/exhaustive-deps
+
+  useEffect(() => {
+    reload();
+    return () => { generation.current++; };
+  }, [reload]);
+
+  const loadMore = () => {
+    if (!nextCursor || loadingMore) return;
+    const current = generation.current;
+    setLoadingMore(true);
+    fetchPage(nextCursor)
+      .then((page) => {
+        if (current !== generation.current) return;
+        setItems((previous) => [...previous, ...(page.items || [])]);
+        setNextCursor(page.nextCursor);
+      })
+      .catch((err) => {
+        if (current === generation.current) setError(err.message);
+      })
+      .finally(() => setLoadingMore(false));
+  };
+
+  return { items, nextCursor, loading, loadingMore, error, loadMore, reload };
+}
@@ -1,25 +1,13 @@
-import React, { useEffect, useState } from 'react';
+import React from 'react';
 import { useNavigate } from 'react-router-dom';
 import api from '../services/apiService';
+import usePagedList from '../hooks/usePagedList';
 
 export default function Facilities() {
-  const [venues, setVenues] = useState([]);
-  const [loading, setLoading] = useState(true);
-  const [error, setError] = useState(null);
+  const { items: venues, nextCursor, loading, loadingMore, error, loadMore } =
+    usePagedList((cursor) => api.getVenues({}, cursor));
   const navigate = useNavigate();
 
-  useEffect(() => {
-    let isMounted = true;
-    api.getVenues()
-      .then((data) => {
-        if (!isMounted) return;
-        setVenues(data || []);
-      })
-      .catch((err) => setError(err.message))
-      .finally(() => setLoading(false));
-    return () => { isMounted = false; };
-  }, []);
-
   if (loading) return <div style={{ padding: 24 }}>Loading facilities...</div>;
   if (error) return <div style={{ padding: 24, color: 'tomato' }}>Error: {error}</div>;
 
@@ -43,6 +31,13 @@ export default function Facilities() {
           </div>
         ))}
       </div>
+      {nextCursor && (
+        <div style={{ textAlign: 'center', marginTop: 20 }}>
+          <button className="btn" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
@@ -38,7 +38,7 @@ const LandingPage = () => {
   useEffect(() => {
     const fetchFeatured = async () => {
       try {
-        const res = await fetch('http://localhost:5001/api/venues');
+        const res = await fetch('http://localhost:5001/api/venues?limit=5');
         if (!res.ok) throw new Error('Failed to fetch venues');
         const data = await res.json();
         setFeaturedVenues(Array.isArray(data) ? data.slice(0, 5) : []);
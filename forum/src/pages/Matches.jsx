@@ -1,35 +1,26 @@
-import React, { useEffect, useMemo, useState } from 'react';
+import React, { useMemo, useState } from 'react';
 import api from '../services/apiService';
+import usePagedList from '../hooks/usePagedList';
 
 export default function Matches() {
-  const [matches, setMatches] = useState([]);
-  const [venues, setVenues] = useState([]);
-  const [loading, setLoading] = useState(true);
-  const [error, setError] = useState(null);
-
   const [filters, setFilters] = useState({ sport: '', venue_id: '', status: '' });
 
-  useEffect(() => {
-    let isMounted = true;
-    Promise.all([api.getMatches(), api.getVenues()])
-      .then(([m, v]) => {
-        if (!isMounted) return;
-        setMatches(m || []);
-        setVenues(v || []);
-      })
-      .catch((err) => setError(err.message))
-      .finally(() => setLoading(false));
-    return () => { isMounted = false; };
-  }, []);
+  // Venue and status are filtered by the server, page by page
+  const {
+    items: matches, nextCursor, loading, loadingMore, error, loadMore, reload: reloadMatches
+  } = usePagedList((cursor) => {
+    const serverFilters = {};
+    if (filters.venue_id) serverFilters.venue_id = filters.venue_id;
+    if (filters.status) serverFilters.status = filters.status;
+    return api.getMatches(serverFilters, cursor);
+  }, [filters.venue_id, filters.status]);
+  const venueList = usePagedList((cursor) => api.getVenues({}, cursor));
+  const venues = venueList.items;
 
+  // The typed sport is matched case-insensitively among the loaded matches
   const filtered = useMemo(() => {
-    return matches.filter((m) => {
-      const sportOk = !filters.sport || m.sport?.toLowerCase() === filters.sport.toLowerCase();
-      const venueOk = !filters.venue_id || Number(m.venue_id) === Number(filters.venue_id);
-      const statusOk = !filters.status || m.status === filters.status;
-      return sportOk && venueOk && statusOk;
-    });
-  }, [matches, filters]);
+    return matches.filter((m) => !filters.sport || m.sport?.toLowerCase() === filters.sport.toLowerCase());
+  }, [matches, filters.sport]);
 
   const handleCreate = async (e) => {
     e.preventDefault();
@@ -45,15 +36,14 @@ export default function Matches() {
         duration_hours: Number(payload.duration_hours || 1),
         max_players: Number(payload.max_players || 10)
       });
-      const fresh = await api.getMatches();
-      setMatches(fresh || []);
       e.currentTarget.reset();
+      reloadMatches();
     } catch (err) {
       alert(err.message);
     }
   };
 
-  if (loading) return <div style={{ padding: 24 }}>Loading matches...</div>;
+  if (loading && matches.length === 0) return <div style={{ padding: 24 }}>Loading matches...</div>;
   if (error) return <div style={{ padding: 24, color: 'tomato' }}>Error: {error}</div>;
 
   return (
@@ -76,6 +66,11 @@ export default function Matches() {
             <input name="start_time" type="time" required />
             <input name="duration_hours" type="number" min="1" max="8" placeholder="Duration (hrs)" />
             <input name="max_players" type="number" min="2" max="40" placeholder="Max players" />
+            {venueList.nextCursor && (
+              <button type="button" className="btn-outline" onClick={venueList.loadMore} disabled={venueList.loadingMore}>
+                {venueList.loadingMore ? 'Loading venues...' : 'Load more venues'}
+              </button>
+            )}
             <button className="btn-primary" type="submit">Create</button>
           </div>
         </form>
@@ -114,17 +109,24 @@ export default function Matches() {
                     const title = prompt('New title', m.title);
                     if (!title) return;
                     await api.updateMatch(m.id, { title });
-                    setMatches(await api.getMatches());
+                    reloadMatches();
                   }}>Edit</button>
                   <button className="btn-outline" onClick={async () => {
                     if (!confirm('Delete match?')) return;
                     await api.deleteMatch(m.id);
-                    setMatches(await api.getMatches());
+                    reloadMatches();
                   }}>Delete</button>
                 </div>
               </div>
             ))}
           </div>
+          {nextCursor && (
+            <div style={{ textAlign: 'center', marginTop: 12 }}>
+              <button className="btn-secondary" onClick={loadMore} disabled={loadingMore}>
+                {loadingMore ? 'Loading...' : 'Load more'}
+              </button>
+            </div>
+          )}
         </div>
       </div>
     </div>
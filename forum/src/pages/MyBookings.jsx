@@ -1,15 +1,24 @@
 import React, { useState, useEffect, useMemo } from "react";
 import { useNavigate, useLocation } from "react-router-dom";
 import "./styles/MyBookings.css";
+import api from "../services/apiService";
+import usePagedList from "../hooks/usePagedList";
 
 export default function MyBookings() {
   const navigate = useNavigate();
   const location = useLocation();
   const [activeTab, setActiveTab] = useState("all");
-  const [bookings, setBookings] = useState([]);
-  const [loading, setLoading] = useState(true);
-  const [error, setError] = useState(null);
   const [user, setUser] = useState(null);
+  const [userError, setUserError] = useState(null);
+  // Newest first, one page at a time; the stats below count the loaded pages
+  const {
+    items: bookings, nextCursor, loading: bookingsLoading, loadingMore, error: bookingsError, loadMore, reload
+  } = usePagedList(
+    (cursor) => (user ? api.getBookings(null, cursor) : Promise.resolve({ items: [], nextCursor: null })),
+    [user]
+  );
+  const loading = !userError && (!user || (bookingsLoading && bookings.length === 0));
+  const error = userError || (bookingsError && 'Failed to load bookings');
 
   const isPastView = useMemo(() => {
     const params = new URLSearchParams(location.search);
@@ -23,34 +32,15 @@ export default function MyBookings() {
       try {
         const user = JSON.parse(userData);
         setUser(user);
-        fetchBookings();
       } catch (error) {
         console.error('Error parsing user data:', error);
-        setError('Failed to load user data');
-        setLoading(false);
+        setUserError('Failed to load user data');
       }
     } else {
-      setError('Please login to view your bookings');
-      setLoading(false);
+      setUserError('Please login to view your bookings');
     }
   }, []);
 
-  const fetchBookings = async () => {
-    try {
-      const response = await fetch(`http://localhost:5001/api/bookings`, { credentials: 'include' });
-      if (!response.ok) {
-        throw new Error('Failed to fetch bookings');
-      }
-      const data = await response.json();
-      setBookings(data);
-      setLoading(false);
-    } catch (error) {
-      console.error('Error fetching bookings:', error);
-      setError('Failed to load bookings');
-      setLoading(false);
-    }
-  };
-
   const handleCancelBooking = async (bookingId) => {
     if (!window.confirm('Are you sure you want to cancel this booking?')) {
       return;
@@ -69,7 +59,7 @@ export default function MyBookings() {
       }
 
       // Refresh bookings
-      fetchBookings();
+      reload();
     } catch (error) {
       console.error('Error canceling booking:', error);
       alert('Failed to cancel booking');
@@ -158,7 +148,7 @@ export default function MyBookings() {
       {/* Booking Stats */}
       <div className="booking-stats">
         <div className="stat-card">
-          <div className="stat-number">{stats.all}</div>
+          <div className="stat-number">{stats.all}{nextCursor ? '+' : ''}</div>
           <div className="stat-label">Total Bookings</div>
         </div>
         <div className="stat-card">
@@ -291,6 +281,14 @@ export default function MyBookings() {
           })
         )}
       </div>
+
+      {nextCursor && (
+        <div className="load-more">
+          <button className="btn" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load more bookings'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
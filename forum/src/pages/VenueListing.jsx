@@ -1,18 +1,21 @@
 import React, { useState, useEffect, useMemo } from "react";
 import { useNavigate, useLocation } from "react-router-dom";
 import "./styles/VenueListing.css";
+import api from "../services/apiService";
+import usePagedList from "../hooks/usePagedList";
 
-export default function VenueListing() {
-  const [venues, setVenues] = useState([]);
-  const [loading, setLoading] = useState(true);
-  const [error, setError] = useState(null);
+const splitSports = (venue) =>
+  Array.isArray(venue.sports)
+    ? venue.sports
+    : venue.sports?.split(",").map(s => s.trim()).filter(Boolean) || [];
 
-  const [currentPage, setCurrentPage] = useState(1);
+export default function VenueListing() {
   const [searchTerm, setSearchTerm] = useState("");
+  const [applied, setApplied] = useState({ query: "", maxPrice: 1000 });
   const [selectedSports, setSelectedSports] = useState([]);
   const [maxPrice, setMaxPrice] = useState(1000);
+  const [sportOptions, setSportOptions] = useState([]);
 
-  const venuesPerPage = 6;
   const navigate = useNavigate();
   const location = useLocation();
 
@@ -29,21 +32,32 @@ export default function VenueListing() {
     return venueImageMap[name] || `/images/venues/${name}.jpg`;
   };
 
+  // Query the server once typing or sliding pauses, not on every change
   useEffect(() => {
-    fetch("http://localhost:5001/api/venues")
-      .then((res) => {
-        if (!res.ok) throw new Error("Failed to fetch venues");
-        return res.json();
-      })
-      .then((data) => {
-        setVenues(data);
-        setLoading(false);
-      })
-      .catch((err) => {
-        setError(err.message);
-        setLoading(false);
-      });
-  }, []);
+    const timer = setTimeout(() => setApplied((previous) => (
+      previous.query === searchTerm.trim() && previous.maxPrice === maxPrice
+        ? previous
+        : { query: searchTerm.trim(), maxPrice }
+    )), 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm, maxPrice]);
+  const { query } = applied;
+
+  // The server filters and pages the list; more pages are loaded on demand
+  const { items: venues, nextCursor, loading, loadingMore, error, loadMore } = usePagedList((cursor) => {
+    if (query) {
+      return api.searchVenues(query, {}, cursor);
+    }
+    const filters = {};
+    if (selectedSports.length > 0) filters.sport = selectedSports.join(",");
+    if (applied.maxPrice < 1000) filters.max_price = applied.maxPrice;
+    return api.getVenues(filters, cursor);
+  }, [applied, selectedSports]);
+
+  // Sports seen so far, so checking one does not hide the others
+  useEffect(() => {
+    setSportOptions((known) => [...new Set([...known, ...venues.flatMap(splitSports)])]);
+  }, [venues]);
 
   // Apply preselected sport from query string, e.g. /VenueListing?sport=Tennis
   useEffect(() => {
@@ -51,23 +65,10 @@ export default function VenueListing() {
     const sport = params.get("sport");
     if (sport) {
       setSelectedSports([sport]);
-      setCurrentPage(1);
     }
   }, [location.search]);
 
-  // Defensive: only call flatMap if venues is an array
-  const allSports = [...new Set(
-    Array.isArray(venues)
-      ? venues.flatMap(v =>
-          Array.isArray(v.sports)
-            ? v.sports
-            : v.sports?.split(",").map(s => s.trim()) || []
-        )
-      : []
-  )];
-
   const toggleSport = (sport) => {
-    setCurrentPage(1);
     if (selectedSports.includes(sport)) {
       setSelectedSports(selectedSports.filter((s) => s !== sport));
     } else {
@@ -75,28 +76,18 @@ export default function VenueListing() {
     }
   };
 
-  const filteredVenues = venues.filter((venue) => {
-    const nameMatch = (venue.court_name || "").toLowerCase().includes(searchTerm.toLowerCase());
-    const sportMatch = (venue.sports || "").toLowerCase().includes(searchTerm.toLowerCase());
-
-    const matchesSearch = nameMatch || sportMatch;
-
+  // Search results are not filtered by the server, apply sport and price here
+  const filteredVenues = !query ? venues : venues.filter((venue) => {
     const matchesSport =
       selectedSports.length === 0 ||
       selectedSports.some((sport) => (venue.sports || "").toLowerCase().includes(sport.toLowerCase()));
 
     const matchesPrice = Number(venue.per_hr_charge) <= maxPrice;
 
-    return matchesSearch && matchesSport && matchesPrice;
+    return matchesSport && matchesPrice;
   });
 
-  const indexOfLastVenue = currentPage * venuesPerPage;
-  const indexOfFirstVenue = indexOfLastVenue - venuesPerPage;
-  const currentVenues = filteredVenues.slice(indexOfFirstVenue, indexOfLastVenue);
-
-  const paginate = (pageNumber) => setCurrentPage(pageNumber);
-
-  if (loading) {
+  if (loading && venues.length === 0) {
     return (
       <div className="venue-listing-container">
         <div className="loading-spinner">
@@ -133,10 +124,7 @@ export default function VenueListing() {
             type="text"
             placeholder="Search by name or sport"
             value={searchTerm}
-            onChange={(e) => {
-              setSearchTerm(e.target.value);
-              setCurrentPage(1);
-            }}
+            onChange={(e) => setSearchTerm(e.target.value)}
             className="search-input"
           />
         </div>
@@ -144,7 +132,7 @@ export default function VenueListing() {
         <div className="filter-group">
           <label>Filter by Sport</label>
           <div className="sport-filters">
-            {allSports.map((sport) => (
+            {sportOptions.map((sport) => (
               <label key={sport} className="sport-checkbox">
                 <input
                   type="checkbox"
@@ -164,10 +152,7 @@ export default function VenueListing() {
             min="0"
             max="1000"
             value={maxPrice}
-            onChange={(e) => {
-              setMaxPrice(Number(e.target.value));
-              setCurrentPage(1);
-            }}
+            onChange={(e) => setMaxPrice(Number(e.target.value))}
             className="price-slider"
           />
         </div>
@@ -178,7 +163,6 @@ export default function VenueListing() {
             setSearchTerm("");
             setSelectedSports([]);
             setMaxPrice(1000);
-            setCurrentPage(1);
           }}
         >
           <i className="fas fa-refresh"></i>
@@ -189,11 +173,14 @@ export default function VenueListing() {
       <main className="venue-listing-main">
         <div className="venue-header">
           <h1>Available Venues</h1>
-          <p>Found {filteredVenues.length} venues matching your criteria</p>
+          <p>
+            Showing {filteredVenues.length} venues matching your criteria
+            {nextCursor ? ", load more to see the rest" : ""}
+          </p>
         </div>
 
         <div className="venue-card-grid">
-          {currentVenues.length === 0 ? (
+          {filteredVenues.length === 0 && !nextCursor ? (
             <div className="no-venues">
               <div className="no-venues-icon">🏟️</div>
               <h3>No venues found</h3>
@@ -211,7 +198,7 @@ export default function VenueListing() {
               </button>
             </div>
           ) : (
-            currentVenues.map((venue) => (
+            filteredVenues.map((venue) => (
               <div
                 className="venue-card"
                 key={venue.v_no}
@@ -262,17 +249,11 @@ export default function VenueListing() {
           )}
         </div>
 
-        {filteredVenues.length > venuesPerPage && (
+        {nextCursor && (
           <div className="pagination">
-            {Array.from({ length: Math.ceil(filteredVenues.length / venuesPerPage) }).map((_, index) => (
-              <button
-                key={index}
-                className={currentPage === index + 1 ? "active" : ""}
-                onClick={() => paginate(index + 1)}
-              >
-                {index + 1}
-              </button>
-            ))}
+            <button onClick={loadMore} disabled={loadingMore}>
+              {loadingMore ? "Loading..." : "Load more venues"}
+            </button>
           </div>
         )}
       </main>
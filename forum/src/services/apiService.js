@@ -19,6 +19,20 @@ class ApiService {
 
     // Generic request method
     async request(endpoint, options = {}) {
+        const { data } = await this.send(endpoint, options);
+        return data;
+    }
+
+    // Fetch one page of a paginated list; pass nextCursor back for the following page (null on the last one)
+    async requestPage(endpoint, cursor = null, options = {}) {
+        const separator = endpoint.includes('?') ? '&' : '?';
+        const pageEndpoint = cursor ? `${endpoint}${separator}cursor=${encodeURIComponent(cursor)}` : endpoint;
+        const { data, response } = await this.send(pageEndpoint, options);
+        return { items: data, nextCursor: response.headers.get('X-Next-Cursor') };
+    }
+
+    // Send a request and return the parsed body with the raw response
+    async send(endpoint, options = {}) {
         const url = `${this.baseURL}${endpoint}`;
         const config = {
             credentials: 'include',
@@ -43,7 +57,7 @@ class ApiService {
                 throw new Error(data.error || `HTTP ${response.status}: ${response.statusText}`);
             }
 
-            return data;
+            return { data, response };
         } catch (error) {
             console.error(`API Error (${endpoint}):`, error);
             throw error;
@@ -83,9 +97,9 @@ class ApiService {
     }
 
     // Venue APIs
-    async getVenues(filters = {}) {
+    async getVenues(filters = {}, cursor = null) {
         const params = new URLSearchParams(filters);
-        return this.request(`/venues?${params}`);
+        return this.requestPage(`/venues?${params}`, cursor);
     }
 
     async getVenue(venueId) {
@@ -112,9 +126,9 @@ class ApiService {
         });
     }
 
-    async searchVenues(query, filters = {}) {
+    async searchVenues(query, filters = {}, cursor = null) {
         const params = new URLSearchParams({ q: query, ...filters });
-        return this.request(`/search/venues?${params}`);
+        return this.requestPage(`/search/venues?${params}`, cursor);
     }
 
     // Booking APIs
@@ -136,9 +150,9 @@ class ApiService {
         });
     }
 
-    async getBookings(userId = null) {
+    async getBookings(userId = null, cursor = null) {
         const endpoint = userId ? `/bookings/user/${userId}` : '/bookings';
-        return this.request(endpoint);
+        return this.requestPage(endpoint, cursor);
     }
 
     async updateBookingStatus(bookingId, status) {
@@ -162,8 +176,8 @@ class ApiService {
         });
     }
 
-    async getVenueReviews(venueId) {
-        return this.request(`/venue/${venueId}/reviews`);
+    async getVenueReviews(venueId, cursor = null) {
+        return this.requestPage(`/venue/${venueId}/reviews`, cursor);
     }
 
     async getVenueRatingsLast7(venueId) {
@@ -226,9 +240,9 @@ class ApiService {
     }
 
     // Matches APIs (secondary DB)
-    async getMatches(filters = {}) {
+    async getMatches(filters = {}, cursor = null) {
         const params = new URLSearchParams(filters);
-        return this.request(`/matches?${params}`);
+        return this.requestPage(`/matches?${params}`, cursor);
     }
 
     async createMatch(matchData) {
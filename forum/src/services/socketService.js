@@ -109,9 +109,18 @@ class SocketService {
         });
 
         // Handle venue updates
+        // The server batches a venue's updates into one message; listeners get them one by one
         this.socket.on('venue_update', (data) => {
             console.log('🏟️ Venue update received:', data);
-            this.emitEvent('venue_update', data);
+            const updates = Array.isArray(data.updates) ? data.updates : [data];
+            updates.forEach((update) => {
+                this.emitEvent('venue_update', {
+                    venue_id: data.venue_id,
+                    type: update.type,
+                    data: update.data,
+                    timestamp: data.timestamp
+                });
+            });
         });
 
         // Handle system messages
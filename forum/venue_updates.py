@@ -0,0 +1,144 @@
+"""
+Coalesced venue_update messages for the venue rooms.
+
+A busy venue produces bursts of new_booking, new_review and venue_updated
+events. Updates for a room are buffered for VENUE_UPDATE_WINDOW_MS
+milliseconds after the first one and sent to the room as one message:
+
+    {"venue_id": 1, "timestamp": "...",
+     "updates": [{"type": "new_booking", "data": {...}},
+                 {"type": "venue_updated", "data": {...}}]}
+
+Within a window, a later update of the same object replaces the earlier
+one. Every update carries the whole object: the server processes sharing
+the room through the message queue each see only their own updates, and
+watchers join at any time, so nobody holds a baseline a delta could
+safely refer to. socketService.js hands each entry of "updates" to its
+venue_update listeners as {venue_id, type, data, timestamp}.
+
+VENUE_UPDATE_WINDOW_MS = 0 sends each update as soon as it is added.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+# Field identifying the object carried by each update type
+ID_FIELDS = {
+    'new_booking': 'Bno',
+    'new_review': 'review_id',
+    'venue_updated': 'v_no',
+}
+
+
+class _Metrics:
+    """Updates in and messages out, and how long updates waited in the buffer"""
+
+    def __init__(self):
+        self.updates = 0
+        self.messages = 0
+        self.superseded = 0
+        self._latency_total_ms = 0.0
+        self._latency_max_ms = 0.0
+        self._sent_updates = 0
+        self._lock = threading.Lock()
+
+    def received(self, superseded):
+        with self._lock:
+            self.updates += 1
+            self.superseded += superseded
+
+    def sent(self, latencies_ms):
+        with self._lock:
+            self.messages += bool(latencies_ms)
+            self._sent_updates += len(latencies_ms)
+            self._latency_total_ms += sum(latencies_ms)
+            self._latency_max_ms = max([self._latency_max_ms, *latencies_ms])
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "updates": self.updates,
+                "messages": self.messages,
+                "messages_saved": self.updates - self.messages,
+                "superseded": self.superseded,
+                "latency_ms": {
+                    "avg": round(self._latency_total_ms / self._sent_updates, 1) if self._sent_updates else 0.0,
+                    "max": round(self._latency_max_ms, 1),
+                },
+            }
+
+
+class VenueUpdateBuffer:
+    """Per-room buffer flushed by a background thread once its window closes"""
+
+    def __init__(self):
+        self.window = 0.1
+        self.metrics = _Metrics()
+        self._socketio = None
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._flusher = None
+
+    def init_app(self, app, socketio):
+        self.window = app.config.get('VENUE_UPDATE_WINDOW_MS', 100) / 1000
+        self._socketio = socketio
+
+    def add(self, venue_id, update_type, data):
+        """Queue an update for the venue's room"""
+        item_id = data.get(ID_FIELDS[update_type]) if update_type in ID_FIELDS else None
+        # Updates without an id never supersede each other
+        key = (update_type, item_id if item_id is not None else object())
+        with self._cond:
+            room = self._pending.get(venue_id)
+            if room is None:
+                room = self._pending[venue_id] = {'due': time.monotonic() + self.window, 'updates': OrderedDict()}
+            superseded = key in room['updates']
+            # Keep the first enqueue time so latency covers the whole wait
+            enqueued = room['updates'].pop(key)[1] if superseded else time.monotonic()
+            room['updates'][key] = (data, enqueued)
+            self.metrics.received(superseded)
+            if self.window and self._flusher is None:
+                # Started on the first update so importing the app never starts threads
+                self._flusher = threading.Thread(target=self._run, name='venue-updates', daemon=True)
+                self._flusher.start()
+            self._cond.notify()
+        if not self.window:
+            self.flush()
+
+    def flush(self, force=True):
+        """Send every room whose window has closed, or all of them when forced"""
+        now = time.monotonic()
+        with self._cond:
+            ready = [venue_id for venue_id, room in self._pending.items() if force or room['due'] <= now]
+            rooms = [(venue_id, self._pending.pop(venue_id)['updates']) for venue_id in ready]
+        for venue_id, updates in rooms:
+            try:
+                self._send(venue_id, updates)
+            except Exception as e:
+                print(f"Error broadcasting venue update: {e}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                delay = min(room['due'] for room in self._pending.values()) - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+            self.flush(force=False)
+
+    def _send(self, venue_id, updates):
+        now = time.monotonic()
+        entries = [{'type': update_type, 'data': data} for (update_type, _), (data, _) in updates.items()]
+        self._socketio.emit('venue_update', {
+            'venue_id': venue_id,
+            'updates': entries,
+            'timestamp': datetime.utcnow().isoformat()
+        }, room=f"venue_{venue_id}")
+        self.metrics.sent([(now - enqueued) * 1000 for _, enqueued in updates.values()])
+
+
+venue_updates = VenueUpdateBuffer()